@@ -1,6 +1,6 @@
 """Application configuration using Pydantic Settings."""
 import os
-from functools import lru_cache
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import List
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -15,6 +15,11 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./reviews.db"
+    db_pool_pre_ping: bool = True  # Postgres only: test connections on checkout
+    db_pool_size: int = 20  # Postgres only
+    db_max_overflow: int = 40  # Postgres only
+    db_pool_recycle: int = 1800  # Postgres only: seconds before a connection is replaced
+    db_query_cache_size: int = 1200  # compiled SQL statements kept per engine
     
     # API
     api_secret_key: str = "dev-secret-key"
@@ -29,14 +34,22 @@ class Settings(BaseSettings):
     # ML
     model_cache_dir: str = "./models_cache"
     sentiment_model: str = "distilbert-base-uncased-finetuned-sst-2-english"
+    max_concurrent_analyses: int = 2  # Analysis pipelines allowed to run at once
+    sentiment_quantize: bool = True  # Dynamic int8 quantization of the sentiment model's Linear layers
+    sentiment_compile: bool = False  # torch.compile the sentiment model (slow first load)
+    sentiment_cache_size: int = 200_000  # Texts whose sentiment is kept on disk; 0 disables
+    sentiment_prefilter: bool = True  # Label clear-cut short texts from a word list, skipping the model
     
     # Groq AI
     groq_api_key: str = ""
     groq_model: str = "llama-3.3-70b-versatile"
+    ai_sample_size: int = 100  # Reviews sampled (in SQL) per AI summary request
+    ai_cache_ttl: int = 3600  # Seconds an identical Groq request is answered from memory
+    groq_rpm: int = 30  # Groq requests started per minute, per process; 0 disables the limit
     
-    @property
+    @cached_property
     def cors_origins_list(self) -> List[str]:
-        """Parse CORS origins from comma-separated string."""
+        """Parse CORS origins from comma-separated string (once per instance)."""
         return [origin.strip() for origin in self.cors_origins.split(",")]
     
     model_config = SettingsConfigDict(
@@ -50,3 +63,10 @@ class Settings(BaseSettings):
 def get_settings() -> Settings:
     """Get cached settings instance."""
     return Settings()
+
+
+# Frequently read values, materialized once at import time so hot paths
+# read plain module globals instead of walking the Settings model.
+_s = get_settings()
+GROQ_API_KEY, GROQ_MODEL, CORS_ORIGINS = _s.groq_api_key, _s.groq_model, tuple(_s.cors_origins_list)
+AI_SAMPLE_SIZE = _s.ai_sample_size
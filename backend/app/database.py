@@ -1,6 +1,8 @@
 """Database configuration with SQLAlchemy."""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import DateTime, create_engine, event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.sql.functions import FunctionElement
 from app.config import get_settings
 
 settings = get_settings()
@@ -9,21 +11,62 @@ settings = get_settings()
 if settings.database_url.startswith("sqlite"):
     engine = create_engine(
         settings.database_url,
-        connect_args={"check_same_thread": False}  # SQLite-specific
+        connect_args={"check_same_thread": False},  # SQLite-specific
+        query_cache_size=settings.db_query_cache_size,
+        insertmanyvalues_page_size=500
     )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Enforce foreign keys; WAL journal + relaxed fsync so readers and writers don't block each other."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")  # honour ON DELETE CASCADE
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 MB
+        cursor.close()
 else:
     engine = create_engine(
         settings.database_url,
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_recycle=settings.db_pool_recycle,
+        query_cache_size=settings.db_query_cache_size,
+        insertmanyvalues_page_size=500
     )
 
-# Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Session factory (expire_on_commit=False: objects stay readable after commit
+# without a re-SELECT per attribute)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
 
 # Base class for models
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
+
+
+class utc_now(FunctionElement):
+    """
+    Current UTC time as a naive timestamp, for server-side defaults: the
+    columns are naive DateTime compared against datetime.utcnow() values,
+    so the database must not fill them with its local time.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_now)
+def _utc_now_default(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utc_now, "postgresql")
+def _utc_now_postgresql(element, compiler, **kw):
+    return "timezone('utc', now())"
 
 
 def get_db():
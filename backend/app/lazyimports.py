@@ -0,0 +1,39 @@
+"""Lazy import proxies.
+
+Heavy service modules (transformers, Groq client, ...) are only imported the
+first time the proxy is actually used, which keeps application startup and
+lightweight endpoints free of their import cost.
+"""
+import importlib
+import threading
+
+
+class LazyImport:
+    """Proxy for a module, or an attribute of a module, imported on first use."""
+
+    def __init__(self, module: str, attr: str = None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    target = importlib.import_module(self._module)
+                    if self._attr:
+                        target = getattr(target, self._attr)
+                    self._target = target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        path = f"{self._module}.{self._attr}" if self._attr else self._module
+        state = "loaded" if self._target is not None else "not loaded"
+        return f"<LazyImport {path} ({state})>"
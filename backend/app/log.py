@@ -0,0 +1,41 @@
+"""Application logging: records are queued and written by a background thread."""
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: int = logging.INFO):
+    """
+    Route the ``app`` logger tree through a queue so request handlers and
+    background tasks never block on stdout; a listener thread does the writes.
+    """
+    global _queue_handler, _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    _queue_handler = QueueHandler(log_queue)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+
+    logger = logging.getLogger("app")
+    logger.addHandler(_queue_handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger("app").removeHandler(_queue_handler)
+    _queue_handler = _listener = None
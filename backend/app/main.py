@@ -9,20 +9,21 @@ if sys.platform == "win32":
 
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from app.config import get_settings
+from app.config import CORS_ORIGINS
 from app.database import init_db
+from app.log import setup_logging, shutdown_logging
+from app.middleware import FrozenCORSMiddleware, ResponseCacheMiddleware
 from app.routers import products, scraping, analysis, comparison, export, ai, demo
 
 
-settings = get_settings()
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
+    setup_logging()
     print("[START] Starting E-commerce Review Analyzer API...")
     init_db()
     print("[OK] Database tables initialized")
@@ -35,6 +36,15 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("[STOP] Shutting down API...")
+    # Close the shared HTTP clients of the (lazily imported) Groq service and scrapers
+    for module in (
+        "app.services.ai.groq_service",
+        "app.services.scraper.amazon",
+        "app.services.scraper.flipkart"
+    ):
+        if module in sys.modules:
+            await sys.modules[module].close_client()
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -53,13 +63,17 @@ app = FastAPI(
     - AI Insights - Groq-powered summaries and suggestions
     """,
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
+# Response cache for product sub-resource GETs (added first so it sits inside CORS)
+app.add_middleware(ResponseCacheMiddleware)
+
 # CORS middleware
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_origins_list,
+    FrozenCORSMiddleware,
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -84,14 +98,21 @@ async def health_check():
 @app.get("/api/stats", tags=["Health"])
 async def get_stats():
     """Get system statistics."""
+    from sqlalchemy import func, select
     from app.database import SessionLocal
     from app.models import Product, Review
     
     db = SessionLocal()
     try:
-        total_products = db.query(Product).count()
-        total_reviews = db.query(Review).count()
-        analyzed_reviews = db.query(Review).filter(Review.sentiment_label.isnot(None)).count()
+        # One statement: COUNT(column) skips NULLs, so analyzed reviews are
+        # counted in the same scan as the total
+        total_products, total_reviews, analyzed_reviews = db.execute(
+            select(
+                select(func.count(Product.id)).scalar_subquery(),
+                func.count(Review.id),
+                func.count(Review.sentiment_label)
+            )
+        ).one()
         
         return {
             "total_products": total_products,
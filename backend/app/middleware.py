@@ -0,0 +1,150 @@
+"""ASGI middleware for the API."""
+import hashlib
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode
+
+from cachetools import TTLCache
+from starlette.middleware.cors import CORSMiddleware
+
+
+# Serialized JSON responses of GET /api/products/{id}[/...], keyed by path + sorted query
+_response_cache = TTLCache(maxsize=512, ttl=60)
+_response_cache_lock = threading.Lock()
+
+CACHE_CONTROL = b"private, max-age=60"
+
+_PRODUCT_PATH_RE = re.compile(r"^/api/products/(\d+)(/.*)?$")
+
+# Query values FastAPI parses as a false bool (case-insensitively); any other
+# force_refresh value (true, 1, yes, on, ...) asks for a refresh
+_FALSE_VALUES = frozenset({"0", "off", "f", "false", "n", "no"})
+
+
+def _forces_refresh(query) -> bool:
+    """Whether the query has a force_refresh parameter that isn't false."""
+    return any(name == "force_refresh" and value.lower() not in _FALSE_VALUES for name, value in query)
+
+
+class FrozenCORSMiddleware(CORSMiddleware):
+    """CORSMiddleware with set-based origin/header lookups instead of list scans."""
+
+    def __init__(self, app, **kwargs):
+        super().__init__(app, **kwargs)
+        self.allow_origins = frozenset(self.allow_origins)
+        self.allow_headers = frozenset(self.allow_headers)
+
+
+def invalidate_product_cache(product_id: int):
+    """Evict every cached response for /api/products/{product_id} and its sub-resources."""
+    path = f"/api/products/{product_id}"
+    with _response_cache_lock:
+        stale = [
+            key for key in list(_response_cache.keys())
+            if key.startswith(path + "?") or key.startswith(path + "/")
+        ]
+        for key in stale:
+            _response_cache.pop(key, None)
+
+
+class ResponseCacheMiddleware:
+    """
+    Cache JSON responses of product GETs (the product itself and its
+    sentiment, aspects, topics, insights and reviews) and replay them
+    byte-for-byte on hits.
+
+    Cached responses carry an ETag and ``Cache-Control: private, max-age=60``;
+    a matching If-None-Match is answered with 304 and no body.
+
+    Any non-GET request under /api/products/{id} evicts that product's
+    entries; background analysis and scraping evict through
+    invalidate_product_cache().
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        match = _PRODUCT_PATH_RE.match(scope["path"])
+        if not match:
+            await self.app(scope, receive, send)
+            return
+
+        product_id = int(match.group(1))
+        query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+
+        # Writes, and explicit refreshes, invalidate whatever we hold for the product
+        if scope["method"] != "GET" or _forces_refresh(query):
+            invalidate_product_cache(product_id)
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = None
+        for name, value in scope["headers"]:
+            if name == b"if-none-match":
+                if_none_match = value
+                break
+
+        key = f"{scope['path']}?{urlencode(sorted(query))}"
+        with _response_cache_lock:
+            cached = _response_cache.get(key)
+        if cached is not None:
+            await _send_cached(send, *cached, if_none_match)
+            return
+
+        start = None
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                if not _is_cacheable(message):
+                    await send(message)
+                    return
+                # Hold the start message until the body (and so the ETag) is known
+                start = message
+            elif message["type"] == "http.response.body" and start is not None:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    body = b"".join(chunks)
+                    etag = b'"' + hashlib.blake2b(body, digest_size=8).hexdigest().encode() + b'"'
+                    headers = [
+                        *(h for h in start["headers"] if h[0].lower() not in (b"etag", b"cache-control")),
+                        (b"etag", etag),
+                        (b"cache-control", CACHE_CONTROL),
+                    ]
+                    with _response_cache_lock:
+                        _response_cache[key] = (headers, body, etag)
+                    await _send_cached(send, headers, body, etag, if_none_match)
+            else:
+                await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+async def _send_cached(send, headers, body, etag, if_none_match):
+    """Send a cached response, or 304 when the client already has this ETag."""
+    if if_none_match is not None and etag in [t.strip() for t in if_none_match.split(b",")]:
+        await send({
+            "type": "http.response.start",
+            "status": 304,
+            "headers": [(b"etag", etag), (b"cache-control", CACHE_CONTROL)],
+        })
+        await send({"type": "http.response.body", "body": b""})
+        return
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _is_cacheable(message: dict) -> bool:
+    """Only successful JSON responses are cached."""
+    if message.get("status") != 200:
+        return False
+    for name, value in message.get("headers", []):
+        if name.lower() == b"content-type":
+            return value.startswith(b"application/json")
+    return False
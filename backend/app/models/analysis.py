@@ -1,8 +1,10 @@
 """Analysis-related models for aspects, topics, and cached results."""
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Numeric, ForeignKey, JSON
-from sqlalchemy.orm import relationship
-from app.database import Base
+from typing import Any, Optional
+
+from sqlalchemy import Integer, String, Text, DateTime, Float, ForeignKey, JSON, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.database import Base, utc_now
 
 
 class ReviewAspect(Base):
@@ -10,16 +12,16 @@ class ReviewAspect(Base):
     
     __tablename__ = "review_aspects"
     
-    id = Column(Integer, primary_key=True, index=True)
-    review_id = Column(Integer, ForeignKey("reviews.id", ondelete="CASCADE"), nullable=False, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    review_id: Mapped[int] = mapped_column(Integer, ForeignKey("reviews.id", ondelete="CASCADE"), index=True)
     
-    aspect_name = Column(String(50), nullable=False)  # quality, price, delivery, etc.
-    sentiment = Column(String(20), nullable=True)  # positive, negative, neutral
-    sentiment_score = Column(Numeric(4, 3), nullable=True)
-    mentioned_text = Column(Text, nullable=True)  # The sentence mentioning this aspect
+    aspect_name: Mapped[str] = mapped_column(String(50))  # quality, price, delivery, etc.
+    sentiment: Mapped[Optional[str]] = mapped_column(String(20))  # positive, negative, neutral
+    sentiment_score: Mapped[Optional[float]] = mapped_column(Float)
+    mentioned_text: Mapped[Optional[str]] = mapped_column(Text)  # The sentence mentioning this aspect
     
     # Relationship
-    review = relationship("Review", back_populates="aspects")
+    review: Mapped["Review"] = relationship(back_populates="aspects", lazy="raise_on_sql")
     
     def __repr__(self):
         return f"<ReviewAspect(aspect='{self.aspect_name}', sentiment='{self.sentiment}')>"
@@ -29,17 +31,21 @@ class AnalysisCache(Base):
     """Cached analysis results for products."""
     
     __tablename__ = "analysis_cache"
+    __table_args__ = (
+        # Serves the "latest fresh entry for (product, type)" cache lookup
+        Index("ix_cache_lookup", "product_id", "analysis_type", "created_at"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"), index=True)
     
-    analysis_type = Column(String(50), nullable=False)  # overall, aspects, topics, insights
-    results = Column(JSON, nullable=False)  # Store analysis as JSON
-    created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, nullable=True)
+    analysis_type: Mapped[str] = mapped_column(String(50))  # overall, aspects, topics, insights
+    results: Mapped[Any] = mapped_column(JSON, nullable=False)  # Store analysis as JSON
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=utc_now())
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     
     # Relationship
-    product = relationship("Product", back_populates="analysis_cache")
+    product: Mapped["Product"] = relationship(back_populates="analysis_cache", lazy="raise_on_sql")
     
     def __repr__(self):
         return f"<AnalysisCache(type='{self.analysis_type}', product_id={self.product_id})>"
@@ -50,18 +56,18 @@ class Topic(Base):
     
     __tablename__ = "topics"
     
-    id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"), index=True)
     
-    topic_number = Column(Integer, nullable=False)
-    topic_keywords = Column(JSON, nullable=True)  # List of keywords stored as JSON
-    topic_label = Column(String(100), nullable=True)  # Human-readable label
-    review_count = Column(Integer, default=0)  # How many reviews belong to this topic
+    topic_number: Mapped[int] = mapped_column(Integer)
+    topic_keywords: Mapped[Optional[Any]] = mapped_column(JSON)  # List of keywords stored as JSON
+    topic_label: Mapped[Optional[str]] = mapped_column(String(100))  # Human-readable label
+    review_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)  # How many reviews belong to this topic
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=utc_now())
     
     # Relationship
-    product = relationship("Product", back_populates="topics")
+    product: Mapped["Product"] = relationship(back_populates="topics", lazy="raise_on_sql")
     
     def __repr__(self):
         return f"<Topic(number={self.topic_number}, label='{self.topic_label}')>"
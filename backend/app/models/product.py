@@ -1,8 +1,10 @@
 """Product model for storing e-commerce product information."""
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Numeric
-from sqlalchemy.orm import relationship
-from app.database import Base
+from typing import List, Optional
+
+from sqlalchemy import Integer, String, Text, DateTime, Float
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.database import Base, utc_now
 
 
 class Product(Base):
@@ -10,20 +12,26 @@ class Product(Base):
     
     __tablename__ = "products"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(500), nullable=True)
-    url = Column(Text, unique=True, nullable=False, index=True)
-    platform = Column(String(50), default="amazon")  # amazon, flipkart
-    total_reviews = Column(Integer, default=0)
-    avg_rating = Column(Numeric(2, 1), nullable=True)
-    scraped_at = Column(DateTime, nullable=True)
-    last_analyzed = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    name: Mapped[Optional[str]] = mapped_column(String(500))
+    url: Mapped[str] = mapped_column(Text, unique=True, index=True)
+    platform: Mapped[Optional[str]] = mapped_column(String(50), default="amazon")  # amazon, flipkart
+    total_reviews: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    avg_rating: Mapped[Optional[float]] = mapped_column(Float)
+    scraped_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    last_analyzed: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=utc_now())
     
-    # Relationships
-    reviews = relationship("Review", back_populates="product", cascade="all, delete-orphan")
-    analysis_cache = relationship("AnalysisCache", back_populates="product", cascade="all, delete-orphan")
-    topics = relationship("Topic", back_populates="product", cascade="all, delete-orphan")
+    # Relationships (implicit lazy loads raise; child rows are removed by ON DELETE CASCADE)
+    reviews: Mapped[List["Review"]] = relationship(
+        back_populates="product", cascade="all, delete-orphan", passive_deletes=True, lazy="raise_on_sql"
+    )
+    analysis_cache: Mapped[List["AnalysisCache"]] = relationship(
+        back_populates="product", cascade="all, delete-orphan", passive_deletes=True, lazy="raise_on_sql"
+    )
+    topics: Mapped[List["Topic"]] = relationship(
+        back_populates="product", cascade="all, delete-orphan", passive_deletes=True, lazy="raise_on_sql"
+    )
     
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name[:30] if self.name else 'N/A'}...')>"
@@ -1,41 +1,53 @@
 """Review model for storing individual product reviews."""
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Numeric, ForeignKey, Date
-from sqlalchemy.orm import relationship
-from app.database import Base
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import Integer, String, Text, DateTime, Boolean, Float, SmallInteger, ForeignKey, Date, Index, text, false
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.database import Base, utc_now
 
 
 class Review(Base):
     """Represents a single review for a product."""
     
     __tablename__ = "reviews"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True)
+    __table_args__ = (
+        # Partial index over analyzed reviews, serves the /api/stats analyzed count
+        Index(
+            "ix_reviews_analyzed", "id",
+            sqlite_where=text("sentiment_label IS NOT NULL"),
+            postgresql_where=text("sentiment_label IS NOT NULL")
+        ),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    product_id: Mapped[int] = mapped_column(Integer, ForeignKey("products.id", ondelete="CASCADE"), index=True)
     
     # Review content
-    review_text = Column(Text, nullable=False)
-    rating = Column(Integer, nullable=False)  # 1-5 stars
-    review_date = Column(Date, nullable=True)
-    reviewer_name = Column(String(200), nullable=True)
+    review_text: Mapped[str] = mapped_column(Text)
+    rating: Mapped[int] = mapped_column(Integer)  # 1-5 stars
+    review_date: Mapped[Optional[date]] = mapped_column(Date)
+    reviewer_name: Mapped[Optional[str]] = mapped_column(String(200))
     
     # Metadata
-    verified_purchase = Column(Boolean, default=False)
-    helpful_count = Column(Integer, default=0)
+    verified_purchase: Mapped[Optional[bool]] = mapped_column(Boolean, default=False, server_default=false())
+    helpful_count: Mapped[Optional[int]] = mapped_column(Integer, default=0, server_default=text("0"))
     
     # Analysis results
-    sentiment_label = Column(String(20), nullable=True)  # positive, negative, neutral
-    sentiment_score = Column(Numeric(4, 3), nullable=True)  # 0.000 to 1.000
-    is_suspicious = Column(Boolean, default=False)
-    suspicious_score = Column(Integer, default=0)  # 0-100
+    sentiment_label: Mapped[Optional[str]] = mapped_column(String(20))  # positive, negative, neutral
+    sentiment_score: Mapped[Optional[float]] = mapped_column(Float)  # 0.000 to 1.000
+    is_suspicious: Mapped[Optional[bool]] = mapped_column(Boolean, default=False, server_default=false())
+    suspicious_score: Mapped[Optional[int]] = mapped_column(SmallInteger, default=0, server_default=text("0"))  # 0-100
     
     # Timestamps
-    scraped_at = Column(DateTime, default=datetime.utcnow)
-    analyzed_at = Column(DateTime, nullable=True)
+    scraped_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=utc_now())
+    analyzed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     
     # Relationships
-    product = relationship("Product", back_populates="reviews")
-    aspects = relationship("ReviewAspect", back_populates="review", cascade="all, delete-orphan")
+    product: Mapped["Product"] = relationship(back_populates="reviews", lazy="raise_on_sql")
+    aspects: Mapped[List["ReviewAspect"]] = relationship(
+        back_populates="review", cascade="all, delete-orphan", passive_deletes=True, lazy="raise_on_sql"
+    )
     
     def __repr__(self):
         return f"<Review(id={self.id}, rating={self.rating}, sentiment='{self.sentiment_label}')>"
@@ -1,12 +1,20 @@
 """AI-powered insights router using Groq API."""
+
+import httpx
+import orjson
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
 
+from app.config import AI_SAMPLE_SIZE, GROQ_API_KEY, GROQ_MODEL
 from app.database import get_db
 from app.models import Product, Review
-from app.services.ai.groq_service import groq_service
+from app.lazyimports import LazyImport
+
+groq_service = LazyImport("app.services.ai.groq_service", "groq_service")
 
 
 router = APIRouter(prefix="/ai")
@@ -28,6 +36,31 @@ class ReviewResponseRequest(BaseModel):
     sentiment: str = "neutral"
 
 
+def _summary_reviews(db: Session, product_id: int):
+    """Load the product and a deterministic sample of its reviews for the summary prompt."""
+    product = db.query(Product).filter(Product.id == product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    # Sample in SQL (the prompt only has room for a handful of reviews), in
+    # the order the prompt ranks them and ties broken by id, so unchanged
+    # reviews give the same prompt and Groq responses can be served from cache
+    rows = db.execute(
+        select(Review.review_text, Review.rating, Review.sentiment_label, Review.sentiment_score)
+        .where(Review.product_id == product_id)
+        .order_by(func.coalesce(Review.sentiment_score, 0).desc(), Review.id)
+        .limit(AI_SAMPLE_SIZE)
+    ).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No reviews found for this product")
+    
+    review_data = (
+        {"text": text, "rating": rating, "sentiment": sentiment or "unknown", "sentiment_score": score}
+        for text, rating, sentiment, score in rows
+    )
+    return product, review_data
+
+
 @router.get("/products/{product_id}/ai-summary", response_model=AIInsightsResponse)
 async def get_ai_summary(product_id: int, db: Session = Depends(get_db)):
     """
@@ -35,28 +68,49 @@ async def get_ai_summary(product_id: int, db: Session = Depends(get_db)):
     
     Returns executive summary, strengths, weaknesses, and recommendations.
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    reviews = db.query(Review).filter(Review.product_id == product_id).all()
-    if not reviews:
-        raise HTTPException(status_code=404, detail="No reviews found for this product")
-    
-    # Prepare review data
-    review_data = [
-        {
-            "text": r.review_text,
-            "rating": r.rating,
-            "sentiment": r.sentiment_label or "unknown"
-        }
-        for r in reviews
-    ]
+    product, review_data = _summary_reviews(db, product_id)
     
     result = await groq_service.generate_review_summary(review_data, product.name or "Product")
     return result
 
 
+@router.get("/products/{product_id}/ai-summary/stream")
+async def stream_ai_summary(product_id: int, db: Session = Depends(get_db)):
+    """
+    Same summary as /ai-summary, streamed as server-sent events while Groq
+    generates it: ``data: {"delta": ...}`` per chunk, then
+    ``data: {"done": true, ...}`` or ``data: {"error": ...}``.
+    """
+    product, review_data = _summary_reviews(db, product_id)
+    product_name = product.name or "Product"
+    
+    async def events():
+        if not GROQ_API_KEY:
+            yield _sse({"error": "Groq API key not configured"})
+            return
+        try:
+            async for delta in groq_service.stream_review_summary(review_data, product_name):
+                yield _sse({"delta": delta})
+        except httpx.TimeoutException:
+            yield _sse({"error": "timeout"})
+            return
+        except Exception as e:
+            yield _sse({"error": str(e)})
+            return
+        yield _sse({"done": True, "model": GROQ_MODEL})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _sse(data: dict) -> str:
+    """One server-sent event carrying data as JSON."""
+    return f"data: {orjson.dumps(data).decode()}\n\n"
+
+
 @router.post("/products/{product_id}/aspect-dive")
 async def get_aspect_deep_dive(
     product_id: int, 
@@ -70,9 +124,26 @@ async def get_aspect_deep_dive(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    reviews = db.query(Review).filter(Review.product_id == product_id).all()
+    # Read the reviews 500 at a time, keeping only those that mention the
+    # aspect, and stop once the deep dive has as many as it sends
+    from app.services.ai.groq_service import ASPECT_DIVE_REVIEWS
     
-    review_data = [{"text": r.review_text, "rating": r.rating} for r in reviews]
+    aspect = request.aspect.lower()
+    review_data = []
+    result = db.execute(
+        select(Review.review_text, Review.rating)
+        .where(Review.product_id == product_id)
+        .execution_options(yield_per=500)
+    )
+    for rows in result.partitions():
+        review_data.extend(
+            {"text": text, "rating": rating}
+            for text, rating in rows
+            if text and aspect in text.lower()
+        )
+        if len(review_data) >= ASPECT_DIVE_REVIEWS:
+            break
+    result.close()
     
     result = await groq_service.generate_aspect_deep_dive(
         request.aspect, 
@@ -97,10 +168,8 @@ async def suggest_review_response(request: ReviewResponseRequest):
 @router.get("/health")
 async def ai_health_check():
     """Check if Groq API is configured."""
-    from app.config import get_settings
-    settings = get_settings()
     return {
-        "groq_configured": bool(settings.groq_api_key),
-        "model": settings.groq_model,
-        "api_key_prefix": settings.groq_api_key[:8] + "..." if settings.groq_api_key else "not set"
+        "groq_configured": bool(GROQ_API_KEY),
+        "model": GROQ_MODEL,
+        "api_key_prefix": GROQ_API_KEY[:8] + "..." if GROQ_API_KEY else "not set"
     }
@@ -1,34 +1,53 @@
 """Analysis endpoints for sentiment, aspects, topics, and insights."""
-from datetime import datetime
+from datetime import datetime, timedelta
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from app.database import get_db
+from app.middleware import invalidate_product_cache
 from app.models import Product, Review, AnalysisCache
 from app.schemas.analysis import (
     SentimentResponse, AspectResponse, TopicResponse, InsightsResponse
 )
+from app.lazyimports import LazyImport
+
+analyze_product_sentiment = LazyImport("app.services.analysis.sentiment", "analyze_product_sentiment")
+analyze_product_aspects = LazyImport("app.services.analysis.aspects", "analyze_product_aspects")
+analyze_product_topics = LazyImport("app.services.analysis.topics", "analyze_product_topics")
+generate_product_insights = LazyImport("app.services.analysis.insights", "generate_product_insights")
+run_complete_analysis = LazyImport("app.services.analysis.runner", "run_complete_analysis")
 
 router = APIRouter()
 
+# In-process cache of fresh AnalysisCache results, keyed by (product_id, analysis_type)
+_mem = TTLCache(maxsize=1024, ttl=300)
+
 
 def get_cached_analysis(db: Session, product_id: int, analysis_type: str):
-    """Get cached analysis if exists and not expired."""
+    """Get cached analysis if exists and not expired (less than 24 hours old)."""
+    key = (product_id, analysis_type)
+    results = _mem.get(key)
+    if results is not None:
+        return results
+    
+    cutoff = datetime.utcnow() - timedelta(hours=24)
     cache = (
         db.query(AnalysisCache)
         .filter(
             AnalysisCache.product_id == product_id,
-            AnalysisCache.analysis_type == analysis_type
+            AnalysisCache.analysis_type == analysis_type,
+            AnalysisCache.created_at > cutoff
         )
-        .order_by(AnalysisCache.created_at.desc())
+        .order_by(AnalysisCache.created_at.desc(), AnalysisCache.id.desc())
+        .limit(1)
         .first()
     )
     
     if cache:
-        # Check if cache is less than 24 hours old
-        age = (datetime.utcnow() - cache.created_at).total_seconds()
-        if age < 86400:  # 24 hours
-            return cache.results
+        _mem[key] = cache.results
+        return cache.results
     
     return None
 
@@ -42,6 +61,13 @@ def save_analysis_cache(db: Session, product_id: int, analysis_type: str, result
     )
     db.add(cache)
     db.commit()
+    _mem.pop((product_id, analysis_type), None)
+
+
+def invalidate_analysis_cache(product_id: int):
+    """Drop all in-process cached analyses for a product."""
+    for key in [k for k in list(_mem.keys()) if k[0] == product_id]:
+        _mem.pop(key, None)
 
 
 @router.get("/{product_id}/sentiment", response_model=SentimentResponse)
@@ -60,14 +86,21 @@ async def get_sentiment_analysis(
     if not force_refresh:
         cached = get_cached_analysis(db, product_id, "sentiment")
         if cached:
-            return SentimentResponse(**cached)
+            # Validated on write; response_model validates it once more on the way out
+            return cached
     
     # Run analysis
-    from app.services.analysis.sentiment import analyze_product_sentiment
     results = await analyze_product_sentiment(db, product_id)
     
+    # The product now has labelled reviews; stamp it as the runner does
+    # (committed with the cache entry below)
+    db.execute(
+        update(Product).where(Product.id == product_id).values(last_analyzed=datetime.utcnow())
+    )
+    
     # Cache results
     save_analysis_cache(db, product_id, "sentiment", results)
+    invalidate_product_cache(product_id)
     
     return SentimentResponse(**results)
 
@@ -86,9 +119,8 @@ async def get_aspect_analysis(
     if not force_refresh:
         cached = get_cached_analysis(db, product_id, "aspects")
         if cached:
-            return AspectResponse(**cached)
+            return cached
     
-    from app.services.analysis.aspects import analyze_product_aspects
     results = await analyze_product_aspects(db, product_id)
     
     save_analysis_cache(db, product_id, "aspects", results)
@@ -110,9 +142,8 @@ async def get_topic_analysis(
     if not force_refresh:
         cached = get_cached_analysis(db, product_id, "topics")
         if cached:
-            return TopicResponse(**cached)
+            return cached
     
-    from app.services.analysis.topics import analyze_product_topics
     results = await analyze_product_topics(db, product_id)
     
     save_analysis_cache(db, product_id, "topics", results)
@@ -134,9 +165,8 @@ async def get_insights(
     if not force_refresh:
         cached = get_cached_analysis(db, product_id, "insights")
         if cached:
-            return InsightsResponse(**cached)
+            return cached
     
-    from app.services.analysis.insights import generate_product_insights
     results = await generate_product_insights(db, product_id)
     
     save_analysis_cache(db, product_id, "insights", results)
@@ -158,10 +188,10 @@ async def reanalyze_product(
     # Clear existing cache
     db.query(AnalysisCache).filter(AnalysisCache.product_id == product_id).delete()
     db.commit()
+    invalidate_analysis_cache(product_id)
     
     # Queue background re-analysis
     async def run_full_analysis():
-        from app.services.analysis import run_complete_analysis
         await run_complete_analysis(product_id)
     
     background_tasks.add_task(run_full_analysis)
@@ -1,11 +1,13 @@
 """Comparison endpoints for comparing multiple products."""
+import asyncio
 from datetime import datetime
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Product
+from app.models import Product, Review, ReviewAspect
 from app.schemas.analysis import ComparisonRequest, ComparisonResponse, ProductComparison
 
 router = APIRouter()
@@ -17,40 +19,88 @@ async def compare_products(
     db: Session = Depends(get_db)
 ):
     """Compare 2-3 products side by side."""
-    # Verify all products exist
-    products = []
+    # Verify all products exist (single IN query, request order preserved)
+    found = {
+        p.id: p
+        for p in db.query(Product).filter(Product.id.in_(request.product_ids)).all()
+    }
     for pid in request.product_ids:
-        product = db.query(Product).filter(Product.id == pid).first()
-        if not product:
+        if pid not in found:
             raise HTTPException(status_code=404, detail=f"Product {pid} not found")
-        products.append(product)
+    products = [found[pid] for pid in request.product_ids]
     
-    # Get analysis for each product
-    from app.services.analysis.insights import generate_product_insights
-    from app.services.analysis.aspects import analyze_product_aspects
+    ids = list(found)
+    
+    # Overall score per product, same formula as generate_product_insights:
+    # 60% sentiment balance + 40% average rating
+    positive = func.sum(case((Review.sentiment_label == "positive", 1), else_=0))
+    negative = func.sum(case((Review.sentiment_label == "negative", 1), else_=0))
+    overall_scores = {}
+    for pid, avg_rating, analyzed, pos, neg in db.execute(
+        select(
+            Review.product_id,
+            func.avg(Review.rating),
+            func.count(Review.sentiment_label),
+            positive,
+            negative
+        )
+        .where(Review.product_id.in_(ids))
+        .group_by(Review.product_id)
+    ):
+        sentiment_score = 50.0
+        if analyzed:
+            sentiment_score = ((pos - neg) / analyzed + 1) / 2 * 100
+        rating_score = float(avg_rating) / 5 * 100
+        overall_scores[pid] = round(sentiment_score * 0.6 + rating_score * 0.4, 2)
+    
+    # Aspect scores from persisted ReviewAspect rows, normalized to 0-1 as in
+    # analyze_product_aspects
+    signed_score = case(
+        (ReviewAspect.sentiment == "positive", ReviewAspect.sentiment_score),
+        (ReviewAspect.sentiment == "negative", -ReviewAspect.sentiment_score),
+        else_=0
+    )
+    aspect_scores = {pid: {} for pid in ids}
+    for pid, aspect_name, avg_score in db.execute(
+        select(Review.product_id, ReviewAspect.aspect_name, func.avg(signed_score))
+        .join(Review, ReviewAspect.review_id == Review.id)
+        .where(Review.product_id.in_(ids))
+        .group_by(Review.product_id, ReviewAspect.aspect_name)
+    ):
+        aspect_scores[pid][aspect_name] = round((float(avg_score) + 1) / 2, 3)
+    
+    # Products that were never analyzed have no aspect rows yet: run the
+    # aspect analysis for those only
+    pending = [
+        p.id for p in products
+        if p.last_analyzed is None or not aspect_scores[p.id]
+    ]
+    if pending:
+        from app.services.analysis.aspects import analyze_product_aspects
+        from app.services.analysis.runner import with_session
+        
+        # Concurrent runs each get a session of their own
+        results = await asyncio.gather(*[
+            with_session(analyze_product_aspects, pid) for pid in pending
+        ])
+        for pid, aspects_data in zip(pending, results):
+            aspect_scores[pid] = {
+                aspect["aspect_name"]: aspect["average_score"]
+                for aspect in aspects_data.get("aspects", [])
+            }
     
     comparisons: List[ProductComparison] = []
     all_aspects = set()
     
     for product in products:
-        # Get insights
-        insights = await generate_product_insights(db, product.id)
-        aspects_data = await analyze_product_aspects(db, product.id)
-        
-        # Build aspect scores
-        aspect_scores = {}
-        for aspect in aspects_data.get("aspects", []):
-            aspect_name = aspect["aspect_name"]
-            aspect_scores[aspect_name] = aspect["average_score"]
-            all_aspects.add(aspect_name)
-        
+        all_aspects.update(aspect_scores[product.id])
         comparisons.append(ProductComparison(
             product_id=product.id,
             product_name=product.name,
-            overall_score=insights["overall_score"],
+            overall_score=overall_scores.get(product.id, 50.0),
             avg_rating=float(product.avg_rating) if product.avg_rating else 0,
             total_reviews=product.total_reviews,
-            aspects=aspect_scores
+            aspects=aspect_scores[product.id]
         ))
     
     # Determine winners
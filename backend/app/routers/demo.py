@@ -1,15 +1,76 @@
+import asyncio
+import logging
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from sqlalchemy import bindparam, insert
 from sqlalchemy.orm import Session
 from app.database import get_db, SessionLocal
 from app.models import Product, Review
 from app.services.analysis.runner import run_complete_analysis
 import random
-from datetime import datetime
+from datetime import date
 import uuid
+from app.services.scraper.base import update_product_stats
 from app.services.scraper.flipkart import FlipkartScraper
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+INSERT_BATCH_SIZE = 500
+
+# Review pools for the OnePlus demo (built once, sampled per request)
+ONEPLUS_POSITIVE_REVIEWS = (
+    "The battery life is insane! Easily lasts a day and a half.",
+    "Performance is buttery smooth with the Snapdragon 8 Gen 2. Gaming is a delight.",
+    "Camera quality is surprisingly good, especially low light.",
+    "Charging speed is mind-blowing. 0 to 100 in 25 mins!",
+    "OxygenOS is clean and bloat-free. Love the experience.",
+    "Best phone under 40k hands down. Display is gorgeous.",
+    "Value for money king. The haptics are also great.",
+    "Design looks premium, though the camera bump is huge.",
+    "Network reception is solid. 5G speeds are great.",
+    "Speakers are loud and clear. Great for media consumption."
+)
+
+ONEPLUS_NEGATIVE_REVIEWS = (
+    "Heating issues while gaming for long sessions.",
+    "No wireless charging is a bummer at this price point.",
+    "Curved screen causes accidental touches sometimes.",
+    "Macro camera is useless. Why even include it?",
+    "Battery drain issue after the latest update.",
+    "Alert slider feels a bit loose compared to previous models.",
+    "No official IP rating? That's concerning.",
+    "The back glass is a fingerprint magnet.",
+    " charger is bulky to carry around.",
+    "Customer service experience was poor."
+)
+
+ONEPLUS_NEUTRAL_REVIEWS = (
+    "It's a good phone but not a huge upgrade from 11R.",
+    "Decent performance, but camera could be better.",
+    "Good daily driver. Nothing extraordinary.",
+    "Average battery life. Expected more.",
+    "Software is okay but has some bugs."
+)
+
+# 30 positive, 10 negative, 10 neutral
+ONEPLUS_RATINGS = (5,) * 30 + (2,) * 10 + (3,) * 10
+
+# One multi-row INSERT for the OnePlus demo, built once: ratings and
+# verified_purchase are baked in, only product id, date, texts and names are bound.
+# Negative reviews come from unverified buyers.
+ONEPLUS_INSERT = insert(Review).values([
+    {
+        "product_id": bindparam("product_id"),
+        "review_text": bindparam(f"text_{i}"),
+        "rating": rating,
+        "reviewer_name": bindparam(f"name_{i}"),
+        "verified_purchase": rating != 2,
+        "review_date": bindparam("review_date"),
+    }
+    for i, rating in enumerate(ONEPLUS_RATINGS)
+])
+
 @router.post("/demo")
 async def create_demo_product(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
@@ -17,32 +78,31 @@ async def create_demo_product(background_tasks: BackgroundTasks, db: Session = D
     """
     # Create a unique demo product
     demo_id = str(uuid.uuid4())[:8]
+    today = date.today()
+    
+    # Dummy reviews
+    reviews = [
+        {"review_text": "Amazing sound quality!", "rating": 5, "reviewer_name": "Alice", "verified_purchase": True},
+        {"review_text": "Battery life is average.", "rating": 3, "reviewer_name": "Bob", "verified_purchase": True},
+        {"review_text": "Best headphones I've ever owned.", "rating": 5, "reviewer_name": "Charlie", "verified_purchase": True},
+        {"review_text": "Too expensive for what it is.", "rating": 2, "reviewer_name": "David", "verified_purchase": False},
+        {"review_text": "Comfortable to wear for long hours.", "rating": 4, "reviewer_name": "Eve", "verified_purchase": True}
+    ]
+    
     product = Product(
         name=f"Demo Headphones {demo_id}",
         # description and price removed as they are not in Product model
         url=f"http://example.com/demo-headphones-{demo_id}",
         platform="Demo"
     )
-    
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    db.flush()
     
-    # Add dummy reviews
-    reviews = [
-        Review(product_id=product.id, review_text="Amazing sound quality!", rating=5, reviewer_name="Alice", verified_purchase=True, review_date=datetime.now().date()),
-        Review(product_id=product.id, review_text="Battery life is average.", rating=3, reviewer_name="Bob", verified_purchase=True, review_date=datetime.now().date()),
-        Review(product_id=product.id, review_text="Best headphones I've ever owned.", rating=5, reviewer_name="Charlie", verified_purchase=True, review_date=datetime.now().date()),
-        Review(product_id=product.id, review_text="Too expensive for what it is.", rating=2, reviewer_name="David", verified_purchase=False, review_date=datetime.now().date()),
-        Review(product_id=product.id, review_text="Comfortable to wear for long hours.", rating=4, reviewer_name="Eve", verified_purchase=True, review_date=datetime.now().date())
-    ]
-    
-    db.add_all(reviews)
-    db.commit()
-    
-    # Update product stats
-    product.total_reviews = len(reviews)
-    product.avg_rating = sum(r.rating for r in reviews) / len(reviews)
+    for r in reviews:
+        r["product_id"] = product.id
+        r["review_date"] = today
+    db.execute(insert(Review), reviews)
+    update_product_stats(db, product.id)
     db.commit()
     
     # Trigger analysis in background
@@ -70,92 +130,31 @@ async def create_oneplus_demo(background_tasks: BackgroundTasks, db: Session = D
             "frontend_url": f"http://localhost:3000/products/{existing.id}"
         }
 
+    # Generate 50 realistic reviews, each pool sampled in one random.choices call
+    first, second = random.choices(ONEPLUS_POSITIVE_REVIEWS, k=30), random.choices(ONEPLUS_POSITIVE_REVIEWS, k=30)
+    texts = (
+        [a + " " + b for a, b in zip(first, second)]
+        + random.choices(ONEPLUS_NEGATIVE_REVIEWS, k=10)
+        + random.choices(ONEPLUS_NEUTRAL_REVIEWS, k=10)
+    )
+    
     product = Product(
         name="OnePlus 13R (Charcoal, 8GB RAM, 128GB Storage)",
         url=f"http://amazon.in/oneplus-13r-demo-{uuid.uuid4()}", # Unique URL
         platform="Amazon"
     )
-    
     db.add(product)
-    db.commit()
-    db.refresh(product)
-    
-    # Generate 50 realistic reviews
-    positive_reviews = [
-        "The battery life is insane! Easily lasts a day and a half.",
-        "Performance is buttery smooth with the Snapdragon 8 Gen 2. Gaming is a delight.",
-        "Camera quality is surprisingly good, especially low light.",
-        "Charging speed is mind-blowing. 0 to 100 in 25 mins!",
-        "OxygenOS is clean and bloat-free. Love the experience.",
-        "Best phone under 40k hands down. Display is gorgeous.",
-        "Value for money king. The haptics are also great.",
-        "Design looks premium, though the camera bump is huge.",
-        "Network reception is solid. 5G speeds are great.",
-        "Speakers are loud and clear. Great for media consumption."
-    ]
+    db.flush()
     
-    negative_reviews = [
-        "Heating issues while gaming for long sessions.",
-        "No wireless charging is a bummer at this price point.",
-        "Curved screen causes accidental touches sometimes.",
-        "Macro camera is useless. Why even include it?",
-        "Battery drain issue after the latest update.",
-        "Alert slider feels a bit loose compared to previous models.",
-        "No official IP rating? That's concerning.",
-        "The back glass is a fingerprint magnet.",
-        " charger is bulky to carry around.",
-        "Customer service experience was poor."
-    ]
+    params = {"product_id": product.id, "review_date": date.today()}
+    user_numbers = random.choices(range(1000, 10000), k=len(texts))
+    for i, (text, number) in enumerate(zip(texts, user_numbers)):
+        params[f"text_{i}"] = text
+        params[f"name_{i}"] = f"User{number}"
     
-    neutral_reviews = [
-        "It's a good phone but not a huge upgrade from 11R.",
-        "Decent performance, but camera could be better.",
-        "Good daily driver. Nothing extraordinary.",
-        "Average battery life. Expected more.",
-        "Software is okay but has some bugs."
-    ]
-    
-    reviews = []
-    # Add 30 positive
-    for _ in range(30):
-        reviews.append(Review(
-            product_id=product.id,
-            review_text=random.choice(positive_reviews) + " " + random.choice(positive_reviews),
-            rating=5,
-            reviewer_name=f"User{random.randint(1000,9999)}",
-            verified_purchase=True,
-            review_date=datetime.now().date()
-        ))
-    
-    # Add 10 negative
-    for _ in range(10):
-        reviews.append(Review(
-            product_id=product.id,
-            review_text=random.choice(negative_reviews),
-            rating=2,
-            reviewer_name=f"User{random.randint(1000,9999)}",
-            verified_purchase=True,
-            review_date=datetime.now().date()
-        ))
-        
-    # Add 10 neutral
-    for _ in range(10):
-        reviews.append(Review(
-            product_id=product.id,
-            review_text=random.choice(neutral_reviews),
-            rating=3,
-            reviewer_name=f"User{random.randint(1000,9999)}",
-            verified_purchase=True,
-            review_date=datetime.now().date()
-        ))
-        
-    db.add_all(reviews)
-    db.commit()
-    
-    # Update product stats
-    product.total_reviews = len(reviews)
-    ratings = [r.rating for r in reviews]
-    product.avg_rating = sum(ratings) / len(ratings)
+    # Core execution: the ORM would read a params dict as a one-row bulk insert
+    db.connection().execute(ONEPLUS_INSERT, params)
+    update_product_stats(db, product.id)
     db.commit()
     
     # Trigger Analysis
@@ -167,50 +166,52 @@ async def create_oneplus_demo(background_tasks: BackgroundTasks, db: Session = D
         "frontend_url": f"http://localhost:3000/products/{product.id}"
     }
 
+def save_scraped_reviews(product_id: int, reviews: list):
+    """Insert scraped reviews with Core executemany batches and refresh the product stats."""
+    db = SessionLocal()
+    try:
+        # Insert in bounded batches, committed once at the end
+        for start in range(0, len(reviews), INSERT_BATCH_SIZE):
+            db.execute(insert(Review), [
+                {
+                    "product_id": product_id,
+                    "review_text": r['text'],
+                    "rating": r['rating'],
+                    "reviewer_name": r['reviewer_name'],
+                    "verified_purchase": r['verified'],
+                    "review_date": r['date']
+                }
+                for r in reviews[start:start + INSERT_BATCH_SIZE]
+            ])
+        update_product_stats(db, product_id)
+        db.commit()
+    finally:
+        db.close()
+
 async def background_scrape_flipkart(product_id: int, url: str):
     """Background task to scrape Flipkart reviews."""
-    print(f"Starting background scrape for {product_id}...")
+    logger.info("Starting background scrape for product %s", product_id)
     scraper = FlipkartScraper()
     reviews = await scraper.scrape_reviews(url, max_reviews=50) # Get up to 50
-    print(f"Scraped {len(reviews)} reviews for {product_id}")
+    logger.info("Scraped %d reviews for product %s", len(reviews), product_id)
     
-    db = SessionLocal()
     try:
-        for r in reviews:
-            review = Review(
-                product_id=product_id,
-                review_text=r['text'],
-                rating=r['rating'],
-                reviewer_name=r['reviewer_name'],
-                verified_purchase=r['verified'],
-                review_date=r['date']
-            )
-            db.add(review)
-        db.commit()
-        print(f"Saved {len(reviews)} reviews to DB")
+        # Blocking DB writes run in a worker thread, off the event loop
+        await asyncio.to_thread(save_scraped_reviews, product_id, reviews)
+        logger.info("Saved %d reviews for product %s", len(reviews), product_id)
         
         # Run Analysis
         await run_complete_analysis(product_id)
         
-    except Exception as e:
-        print(f"Error in background task: {e}")
-    finally:
-        db.close()
+    except Exception:
+        logger.exception("Background scrape failed for product %s", product_id)
 
 @router.post("/demo/oneplus-flipkart")
 async def create_oneplus_flipkart_demo(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
     Create a demo product using REAL data scraped from Flipkart.
     """
-    scraper = FlipkartScraper()
-    url = await scraper.find_product_url_from_search("https://www.flipkart.com/search?q=OnePlus+13R")
-    
-    if not url:
-        return {"error": "Could not find OnePlus 13R on Flipkart"}
-    
-    print(f"Found Flipkart URL: {url}")
-
-    # Check for existing
+    # Check for existing before hitting Flipkart
     existing = db.query(Product).filter(Product.name.ilike("%OnePlus 13R%Flipkart%")).first()
     if existing:
         # Re-trigger analysis just in case
@@ -220,6 +221,14 @@ async def create_oneplus_flipkart_demo(background_tasks: BackgroundTasks, db: Se
             "product_id": existing.id,
             "frontend_url": f"http://localhost:3000/products/{existing.id}"
         }
+    
+    scraper = FlipkartScraper()
+    url = await scraper.find_product_url_from_search("https://www.flipkart.com/search?q=OnePlus+13R")
+    
+    if not url:
+        return {"error": "Could not find OnePlus 13R on Flipkart"}
+    
+    logger.info("Found Flipkart URL: %s", url)
         
     # Create Product
     product = Product(
@@ -230,7 +239,6 @@ async def create_oneplus_flipkart_demo(background_tasks: BackgroundTasks, db: Se
     
     db.add(product)
     db.commit()
-    db.refresh(product)
     
     # Scrape reviews in background
     background_tasks.add_task(background_scrape_flipkart, product.id, url)
@@ -1,82 +1,116 @@
 """Export endpoints for PDF and CSV downloads."""
 import io
 import csv
+import tempfile
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models import Product, Review
 
 router = APIRouter()
 
 
+CSV_HEADER = [
+    "Review ID", "Rating", "Review Text", "Review Date",
+    "Reviewer Name", "Verified Purchase", "Helpful Count",
+    "Sentiment", "Sentiment Score", "Is Suspicious"
+]
+
+
+# PDFs up to this size are kept in memory; larger ones are spooled to a temp file
+PDF_SPOOL_SIZE = 1024 * 1024
+PDF_CHUNK_SIZE = 64 * 1024
+
+
+def iter_file_chunks(file, chunk_size: int = PDF_CHUNK_SIZE):
+    """Yield a file in fixed-size chunks, closing it once sent."""
+    try:
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
+
+
+def iter_reviews_csv(product_id: int, batch_size: int = 1000):
+    """Yield the reviews CSV one DB batch at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue()
+    
+    # Own session: the response body is produced after the request's
+    # dependency-managed session may already be closed
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            select(
+                Review.id, Review.rating, Review.review_text, Review.review_date,
+                Review.reviewer_name, Review.verified_purchase, Review.helpful_count,
+                Review.sentiment_label, Review.sentiment_score, Review.is_suspicious
+            )
+            .where(Review.product_id == product_id)
+            .execution_options(yield_per=batch_size)
+        )
+        for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                (*row[:8], float(row[8]) if row[8] else None, row[9])
+                for row in rows
+            )
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
 @router.get("/{product_id}/export/csv")
-async def export_csv(product_id: int, db: Session = Depends(get_db)):
-    """Export all reviews as CSV."""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+def export_csv(product_id: int, db: Session = Depends(get_db)):
+    """Export all reviews as CSV, streamed in batches."""
+    exists = db.query(Product.id).filter(Product.id == product_id).first()
+    if not exists:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    reviews = db.query(Review).filter(Review.product_id == product_id).all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow([
-        "Review ID", "Rating", "Review Text", "Review Date",
-        "Reviewer Name", "Verified Purchase", "Helpful Count",
-        "Sentiment", "Sentiment Score", "Is Suspicious"
-    ])
-    
-    # Data rows
-    for review in reviews:
-        writer.writerow([
-            review.id,
-            review.rating,
-            review.review_text,
-            review.review_date,
-            review.reviewer_name,
-            review.verified_purchase,
-            review.helpful_count,
-            review.sentiment_label,
-            float(review.sentiment_score) if review.sentiment_score else None,
-            review.is_suspicious
-        ])
-    
-    output.seek(0)
-    
     filename = f"reviews_{product_id}_{datetime.now().strftime('%Y%m%d')}.csv"
     
     return StreamingResponse(
-        iter([output.getvalue()]),
+        iter_reviews_csv(product_id),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
 @router.get("/{product_id}/export/pdf")
-async def export_pdf(product_id: int, db: Session = Depends(get_db)):
-    """Export analysis report as PDF."""
+def export_pdf(product_id: int, db: Session = Depends(get_db)):
+    """
+    Export analysis report as PDF. A plain ``def``: the queries, insight
+    aggregation and PDF rendering all block, so FastAPI runs the whole
+    handler in the threadpool.
+    """
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
     # Get analysis data
-    from app.services.analysis.insights import generate_product_insights
-    insights = await generate_product_insights(db, product_id)
+    from app.services.analysis.insights import build_product_insights
+    insights = build_product_insights(db, product_id)
     
-    # Generate PDF
+    # Generate PDF into a buffer that spills to disk past PDF_SPOOL_SIZE
     from app.services.export.pdf_generator import generate_analysis_pdf
-    pdf_buffer = generate_analysis_pdf(product, insights)
+    pdf_file = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_SIZE)
+    try:
+        generate_analysis_pdf(product, insights, pdf_file)
+    except BaseException:
+        pdf_file.close()
+        raise
     
     filename = f"analysis_{product_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
     
     return StreamingResponse(
-        pdf_buffer,
+        iter_file_chunks(pdf_file),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -1,46 +1,73 @@
 """Product management endpoints."""
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import TypeAdapter
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import Product, Review
+from app.routers.analysis import invalidate_analysis_cache
 from app.schemas.product import ProductResponse, ProductListResponse
 from app.schemas.review import ReviewResponse, ReviewListResponse
 import math
 
 router = APIRouter()
 
+# Whole-page conversion from ORM rows in a single pydantic-core pass
+PRODUCT_LIST_ADAPTER = TypeAdapter(List[ProductResponse])
+REVIEW_LIST_ADAPTER = TypeAdapter(List[ReviewResponse])
+
+# Handlers are plain ``def``: their DB calls are blocking, so FastAPI runs
+# them in the threadpool instead of on the event loop.
+
+
+def _json_response(model) -> Response:
+    """
+    Serialize an already-validated response model straight to JSON bytes.
+    
+    Returning a Response skips FastAPI's jsonable_encoder pass and the
+    response_model re-validation; response_model stays on the route for
+    the OpenAPI schema.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def _count_past_end(db: Session, stmt, page: int) -> int:
+    """Total for an empty page: 0 on page 1, otherwise a separate COUNT."""
+    if page == 1:
+        return 0
+    return db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+
 
 @router.get("", response_model=ProductListResponse)
-async def list_products(
+def list_products(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=50),
     db: Session = Depends(get_db)
 ):
     """List all analyzed products with pagination."""
-    total = db.query(Product).count()
-    total_pages = math.ceil(total / page_size) if total > 0 else 1
-    
-    products = (
-        db.query(Product)
+    # Page and total count in one statement via COUNT(*) OVER ()
+    rows = db.execute(
+        select(Product, func.count().over().label("total"))
         .order_by(Product.created_at.desc())
         .offset((page - 1) * page_size)
         .limit(page_size)
-        .all()
-    )
+    ).all()
+    total = rows[0].total if rows else _count_past_end(db, select(Product.id), page)
+    total_pages = math.ceil(total / page_size) if total > 0 else 1
     
-    return ProductListResponse(
-        items=[ProductResponse.model_validate(p) for p in products],
+    return _json_response(ProductListResponse(
+        items=PRODUCT_LIST_ADAPTER.validate_python([row.Product for row in rows], from_attributes=True),
         total=total,
         page=page,
         page_size=page_size,
         total_pages=total_pages
-    )
+    ))
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+def get_product(product_id: int, db: Session = Depends(get_db)):
     """Get a single product by ID."""
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
@@ -49,19 +76,22 @@ async def get_product(product_id: int, db: Session = Depends(get_db)):
 
 
 @router.delete("/{product_id}")
-async def delete_product(product_id: int, db: Session = Depends(get_db)):
+def delete_product(product_id: int, db: Session = Depends(get_db)):
     """Delete a product and all its reviews."""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    # Single DELETE; reviews, aspects, topics and cache rows go via ON DELETE CASCADE
+    result = db.execute(delete(Product).where(Product.id == product_id))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    db.delete(product)
     db.commit()
+    # SQLite can hand the id to the next product created, so nothing
+    # cached for this one may outlive it
+    invalidate_analysis_cache(product_id)
     return {"message": f"Product {product_id} deleted successfully"}
 
 
 @router.get("/{product_id}/reviews", response_model=ReviewListResponse)
-async def get_product_reviews(
+def get_product_reviews(
     product_id: int,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -76,31 +106,31 @@ async def get_product_reviews(
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Build query with filters
-    query = db.query(Review).filter(Review.product_id == product_id)
+    # Build filters
+    filters = [Review.product_id == product_id]
     
     if sentiment:
-        query = query.filter(Review.sentiment_label == sentiment)
+        filters.append(Review.sentiment_label == sentiment)
     if rating:
-        query = query.filter(Review.rating == rating)
+        filters.append(Review.rating == rating)
     if verified_only:
-        query = query.filter(Review.verified_purchase.is_(True))
+        filters.append(Review.verified_purchase.is_(True))
     
-    total = query.count()
-    total_pages = math.ceil(total / page_size) if total > 0 else 1
-    
-    reviews = (
-        query
+    # Page and total count in one statement via COUNT(*) OVER ()
+    rows = db.execute(
+        select(Review, func.count().over().label("total"))
+        .where(*filters)
         .order_by(Review.scraped_at.desc())
         .offset((page - 1) * page_size)
         .limit(page_size)
-        .all()
-    )
+    ).all()
+    total = rows[0].total if rows else _count_past_end(db, select(Review.id).where(*filters), page)
+    total_pages = math.ceil(total / page_size) if total > 0 else 1
     
-    return ReviewListResponse(
-        items=[ReviewResponse.model_validate(r) for r in reviews],
+    return _json_response(ReviewListResponse(
+        items=REVIEW_LIST_ADAPTER.validate_python([row.Review for row in rows], from_attributes=True),
         total=total,
         page=page,
         page_size=page_size,
         total_pages=total_pages
-    )
+    ))
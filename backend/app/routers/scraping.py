@@ -1,26 +1,32 @@
 """Scraping endpoints for initiating and monitoring scrape jobs."""
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from typing import Dict
 
 from app.schemas.scraping import ScrapeRequest, ScrapeStatusResponse, JobStatus
+from app.services.scraper.base import detect_platform
 
 router = APIRouter()
 
 # In-memory job storage (in production, use Redis)
 scrape_jobs: Dict[str, dict] = {}
 
+# Finished jobs are kept this long for status polls, then dropped
+JOB_RETENTION = timedelta(hours=1)
+FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
 
-def detect_platform(url: str) -> str:
-    """Detect e-commerce platform from URL."""
-    url_lower = url.lower()
-    if "amazon" in url_lower:
-        return "amazon"
-    elif "flipkart" in url_lower:
-        return "flipkart"
-    else:
-        raise ValueError("Unsupported platform. Only Amazon and Flipkart are supported.")
+
+def prune_finished_jobs():
+    """Drop finished jobs older than JOB_RETENTION so the store stays bounded."""
+    cutoff = datetime.utcnow() - JOB_RETENTION
+    expired = [
+        job_id for job_id, job in scrape_jobs.items()
+        if job["status"] in FINISHED_STATUSES
+        and job["completed_at"] is not None and job["completed_at"] < cutoff
+    ]
+    for job_id in expired:
+        scrape_jobs.pop(job_id, None)
 
 
 async def run_scrape_job(job_id: str, url: str, max_reviews: int):
@@ -69,6 +75,8 @@ async def start_scraping(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
+    prune_finished_jobs()
+    
     # Create job
     job_id = str(uuid.uuid4())
     scrape_jobs[job_id] = {
@@ -1,7 +1,6 @@
 """Pydantic schemas for Analysis results."""
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from decimal import Decimal
 from pydantic import BaseModel, Field
 
 
@@ -71,6 +70,7 @@ class InsightsResponse(BaseModel):
     
     # Distributions
     rating_distribution: Dict[int, int]  # 1-5 star counts
+    rating_percentages: Dict[int, float] = {}  # 1-5 star shares, rounded to 0.1
     sentiment_distribution: SentimentDistribution
     
     # Key findings
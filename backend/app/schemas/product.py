@@ -1,7 +1,6 @@
 """Pydantic schemas for Product operations."""
 from datetime import datetime
 from typing import Optional, List
-from decimal import Decimal
 from pydantic import BaseModel, HttpUrl, Field
 
 
@@ -30,7 +29,7 @@ class ProductResponse(BaseModel):
     url: str
     platform: str
     total_reviews: int
-    avg_rating: Optional[Decimal]
+    avg_rating: Optional[float]
     scraped_at: Optional[datetime]
     last_analyzed: Optional[datetime]
     created_at: datetime
@@ -1,7 +1,6 @@
 """Pydantic schemas for Review operations."""
 from datetime import datetime, date
 from typing import Optional, List
-from decimal import Decimal
 from pydantic import BaseModel, Field
 
 
@@ -31,7 +30,7 @@ class ReviewResponse(BaseModel):
     verified_purchase: bool
     helpful_count: int
     sentiment_label: Optional[str]
-    sentiment_score: Optional[Decimal]
+    sentiment_score: Optional[float]
     is_suspicious: bool
     suspicious_score: int
     scraped_at: datetime
@@ -59,7 +58,7 @@ class AspectDetail(BaseModel):
     """Detail of an aspect mentioned in a review."""
     aspect_name: str
     sentiment: Optional[str]
-    sentiment_score: Optional[Decimal]
+    sentiment_score: Optional[float]
     mentioned_text: Optional[str]
     
     class Config:
@@ -1,32 +1,373 @@
 """Groq AI service for intelligent review analysis and suggestions."""
+import asyncio
 import logging
-from typing import List, Dict, Optional
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
 import httpx
+import orjson
 
 
 from app.config import get_settings
+from app.services.ai.llm_cache import LLMCache
+from app.services.analysis.fake_detection import duplicate_key
 
 logger = logging.getLogger(__name__)
 
+# Reviews sent per summary prompt, and characters kept of each
+SUMMARY_REVIEWS = 20
+SUMMARY_REVIEW_CHARS = 120
+
+# Reviews mentioning the aspect sent per aspect deep dive
+ASPECT_DIVE_REVIEWS = 15
+
+# Reviews per batch-summary prompt, and batch prompts in flight at once
+BATCH_SUMMARY_SIZE = 16
+BATCH_SUMMARY_CONCURRENCY = 8
+
+# Attempts per request when Groq answers 429 (rate limited); the wait
+# doubles each time unless Groq sends Retry-After
+RATE_LIMIT_ATTEMPTS = 3
+
+# Fixed instructions go in the system message and the per-call data (product,
+# reviews) last, so every request shares the same prompt prefix and the
+# provider's prompt cache can serve it.
+REVIEW_SUMMARY_SYSTEM = """You are an expert product analyst. Provide concise, actionable insights from customer reviews. Be balanced and helpful.
+
+For the product and customer reviews given, provide:
+
+1. **Executive Summary** (2-3 sentences): Overall product perception
+2. **Key Strengths** (bullet points): What customers love most
+3. **Key Weaknesses** (bullet points): Common complaints
+4. **Purchase Recommendation**: Should someone buy this? Why/why not?
+5. **Suggested Improvements**: What should the manufacturer improve?
+
+Provide a helpful, balanced analysis."""
+
+ASPECT_DIVE_SYSTEM = """You are a product analyst. Be concise and helpful.
+
+Analyze what customers say about the given aspect of the given product, from the reviews mentioning it. Provide:
+1. Overall sentiment about the aspect
+2. Specific praise (if any)
+3. Specific complaints (if any)
+4. Comparison to expectations
+
+Keep it concise (3-4 sentences max)."""
+
+BATCH_SUMMARY_SYSTEM = """You are an expert product analyst. Extract the main points from a batch of customer reviews of a product. A review posted several times is listed once with its count, e.g. (x3).
+
+Reply with a JSON object with exactly these keys:
+- "summary": one sentence on how these customers perceive the product
+- "strengths": list of short phrases for what customers praise
+- "weaknesses": list of short phrases for what customers complain about
+- "improvements": list of short suggestions for the manufacturer"""
+
+BATCH_SUMMARY_LISTS = ("strengths", "weaknesses", "improvements")
+
+SELLER_RESPONSE_SYSTEM = """You are a professional customer service representative.
+
+Given a customer review, write a professional, empathetic seller response (2-3 sentences) that:
+- Thanks the customer
+- Addresses their specific points
+- Offers help if negative, appreciation if positive"""
+
+
+def _unique_reviews(reviews: Iterable[Dict]) -> List[Tuple[Dict, int]]:
+    """Reviews with identical text (ignoring case and spacing) collapsed to (first, count)."""
+    counts: Dict[str, List] = {}
+    for r in reviews:
+        entry = counts.setdefault(" ".join(r.get('text', '').lower().split()), [r, 0])
+        entry[1] += 1
+    return [(r, n) for r, n in counts.values()]
+
+
+def _merge_points(lists: Iterable) -> List[str]:
+    """Concatenate lists of phrases, dropping repeats (case-insensitively)."""
+    merged = {}
+    for points in lists:
+        if not isinstance(points, list):
+            continue
+        for point in points:
+            if isinstance(point, str) and point.strip():
+                merged.setdefault(point.strip().lower(), point.strip())
+    return list(merged.values())
+
+
+class RequestLimiter:
+    """
+    Token bucket: at most ``max_rate`` requests start per ``period`` seconds,
+    in bursts of up to ``max_rate``. Each caller reserves the next free slot
+    before sleeping, so concurrent callers are spaced out in arrival order.
+    A ``max_rate`` of 0 disables the limit.
+    """
+    
+    def __init__(self, max_rate: int, period: float = 60.0):
+        self.max_rate = max_rate
+        self.interval = period / max_rate if max_rate else 0.0
+        self._next_slot = 0.0
+    
+    async def acquire(self):
+        if not self.max_rate:
+            return
+        now = time.monotonic()
+        slot = max(self._next_slot, now)
+        self._next_slot = slot + self.interval
+        wait = slot - now - (self.max_rate - 1) * self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def _retry_after(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying a 429: Retry-After if given, else 1, 2, 4..."""
+    try:
+        return float(response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return float(2 ** attempt)
+
+
+class GroqAPIError(Exception):
+    """Non-200 response from the Groq chat completions endpoint."""
+    
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"Groq API error: {status_code}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+# Shared by every GroqService in the process, since Groq limits per API key
+_limiter = RequestLimiter(get_settings().groq_rpm)
+
+BASE_URL = "https://api.groq.com/openai/v1"
+
+# Created on first use and closed on shutdown, so every GroqService in the
+# process reuses the same kept-alive connections
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared HTTP/2 client for Groq requests (the API key is sent per request)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            headers={"Content-Type": "application/json"},
+            http2=True,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared client, on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 class GroqService:
     """Service for Groq API integration."""
     
     def __init__(self):
         settings = get_settings()
         self.api_key = settings.groq_api_key
-        self.base_url = "https://api.groq.com/openai/v1/chat/completions"
+        self.base_url = BASE_URL
         self.model = settings.groq_model
+        self.cache = LLMCache(ttl=settings.ai_cache_ttl)
+        # Identical requests in flight share one API call
+        self._inflight: Dict[str, asyncio.Task] = {}
         if self.api_key:
             logger.info(f"Groq API configured with key: {self.api_key[:8]}... model: {self.model}")
         else:
             logger.warning("Groq API key not found! AI features will be disabled.")
     
-    async def generate_review_summary(self, reviews: List[Dict], product_name: str) -> Dict:
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The process-wide client (see get_client)."""
+        return get_client()
+    
+    @property
+    def _auth_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+    
+    def _payload(
+        self,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[Dict] = None
+    ) -> Dict:
+        """Chat completion request body."""
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if response_format is not None:
+            payload["response_format"] = response_format
+        return payload
+    
+    @staticmethod
+    def _timeout(system: str, prompt: str, max_read_timeout: float) -> httpx.Timeout:
+        """Read timeout scaled to prompt length; everything else fails fast."""
+        return httpx.Timeout(
+            connect=3.0,
+            read=min(max_read_timeout, 5.0 + len(system + prompt) // 1000 * 3),
+            write=5.0,
+            pool=2.0
+        )
+    
+    async def _chat(
+        self,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        max_read_timeout: float = 30.0,
+        response_format: Optional[Dict] = None
+    ) -> str:
+        """
+        Run one chat completion and return the reply text. Identical
+        requests are answered from the in-memory cache, or join the call
+        already in flight.
+        
+        The read timeout scales with prompt length (5s plus 3s per 1000
+        characters, capped at max_read_timeout); connecting, writing and
+        waiting for a pooled connection fail fast. ``response_format`` is
+        passed through, e.g. ``{"type": "json_object"}`` for a JSON reply.
+        
+        Raises:
+            GroqAPIError: on a non-200 response
+            httpx.TimeoutException: when Groq is too slow to answer
+        """
+        payload = self._payload(system, prompt, temperature, max_tokens, response_format)
+        key = self.cache.make_key(payload)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        task = self._inflight.get(key)
+        if task is None:
+            timeout = self._timeout(system, prompt, max_read_timeout)
+            task = asyncio.ensure_future(self._complete(key, payload, timeout))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A cancelled caller must not cancel the call other callers are waiting on
+        return await asyncio.shield(task)
+    
+    async def _complete(self, key: str, payload: Dict, timeout: httpx.Timeout) -> str:
+        """
+        POST one chat completion and cache the reply. Requests go through
+        the process-wide rate limiter, and a 429 is retried with backoff.
+        """
+        body = orjson.dumps(payload)
+        for attempt in range(RATE_LIMIT_ATTEMPTS):
+            await _limiter.acquire()
+            response = await self.client.post(
+                "/chat/completions", headers=self._auth_headers, timeout=timeout, content=body
+            )
+            if response.status_code != 429 or attempt == RATE_LIMIT_ATTEMPTS - 1:
+                break
+            delay = _retry_after(response, attempt)
+            logger.warning(f"Groq rate limited, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        if response.status_code != 200:
+            raise GroqAPIError(response.status_code, response.text)
+        content = orjson.loads(response.content)["choices"][0]["message"]["content"]
+        self.cache.set(key, content)
+        return content
+    
+    async def _chat_stream(
+        self,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        max_read_timeout: float = 30.0
+    ) -> AsyncIterator[str]:
+        """
+        Run one chat completion with ``stream: true`` and yield the reply
+        text as it arrives. The full reply is cached under the same key as
+        the non-streaming request, and a cache hit is yielded whole.
+        
+        Raises:
+            GroqAPIError: on a non-200 response
+            httpx.TimeoutException: when Groq stops sending
+        """
+        payload = self._payload(system, prompt, temperature, max_tokens)
+        key = self.cache.make_key(payload)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        timeout = self._timeout(system, prompt, max_read_timeout)
+        parts = []
+        await _limiter.acquire()
+        async with self.client.stream(
+            "POST",
+            "/chat/completions",
+            headers=self._auth_headers,
+            timeout=timeout,
+            content=orjson.dumps({**payload, "stream": True})
+        ) as response:
+            if response.status_code != 200:
+                detail = (await response.aread()).decode(errors="replace")
+                raise GroqAPIError(response.status_code, detail)
+            # Server-sent events: one "data: {chunk}" line per delta, then "data: [DONE]"
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                choices = orjson.loads(data).get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        self.cache.set(key, "".join(parts))
+    
+    @staticmethod
+    def _summary_prompt(reviews: Iterable[Dict], product_name: str) -> Tuple[str, int]:
+        """Build the summary prompt; returns (prompt, number of reviews included)."""
+        # Keep the prompt small: strongest opinions first, templated
+        # duplicates dropped, each review clipped
+        review_sample = []
+        seen = set()
+        for r in sorted(reviews, key=lambda r: r.get('sentiment_score') or 0, reverse=True):
+            key = duplicate_key(r.get('text', ''))
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            review_sample.append(r)
+            if len(review_sample) == SUMMARY_REVIEWS:
+                break
+        review_texts = "\n".join([
+            f"- {r.get('rating', 'N/A')}/5: {r.get('text', '')[:SUMMARY_REVIEW_CHARS]}"
+            for r in review_sample
+        ])
+        
+        prompt = f"""Product: "{product_name}"
+
+Reviews:
+{review_texts}"""
+        return prompt, len(review_sample)
+    
+    async def generate_review_summary(self, reviews: Iterable[Dict], product_name: str) -> Dict:
         """
         Generate an AI summary of product reviews.
         
         Args:
-            reviews: List of review dictionaries with text and rating
+            reviews: Iterable of review dictionaries with text, rating and
+                (optionally) sentiment_score; the 20 most confidently
+                classified, non-templated ones are sent
             product_name: Name of the product
             
         Returns:
@@ -39,75 +380,149 @@ class GroqService:
                 "suggestions": []
             }
         
-        # Prepare review text (limit to avoid token limits)
-        review_sample = reviews[:20]  # Take top 20 reviews
+        prompt, reviews_analyzed = self._summary_prompt(reviews, product_name)
+        
+        try:
+            ai_response = await self._chat(
+                REVIEW_SUMMARY_SYSTEM,
+                prompt,
+                temperature=0.7,
+                max_tokens=500
+            )
+        except httpx.TimeoutException:
+            return {
+                "error": "timeout",
+                "summary": None
+            }
+        except GroqAPIError as e:
+            logger.error(f"Groq API error {e.status_code}: {e.detail}")
+            return {
+                "error": f"Groq API error: {e.status_code} - {e.detail[:200]}",
+                "summary": None,
+                "details": e.detail
+            }
+        except Exception as e:
+            return {
+                "error": str(e),
+                "summary": None
+            }
+        
+        return {
+            "summary": ai_response,
+            "model": self.model,
+            "reviews_analyzed": reviews_analyzed,
+            "error": None
+        }
+    
+    async def stream_review_summary(self, reviews: Iterable[Dict], product_name: str) -> AsyncIterator[str]:
+        """
+        Stream the review summary text as Groq generates it; same prompt
+        and sampling as generate_review_summary(), so the two share cache
+        entries.
+        
+        Raises:
+            GroqAPIError: on a non-200 response
+            httpx.TimeoutException: when Groq is too slow to answer
+        """
+        prompt, _ = self._summary_prompt(reviews, product_name)
+        async for delta in self._chat_stream(
+            REVIEW_SUMMARY_SYSTEM,
+            prompt,
+            temperature=0.7,
+            max_tokens=500
+        ):
+            yield delta
+    
+    async def _summarize_batch(
+        self,
+        batch: Sequence[Tuple[Dict, int]],
+        product_name: str,
+        slots: asyncio.Semaphore
+    ) -> Dict:
+        """Key points of one batch of (review, times posted), parsed from Groq's JSON reply."""
         review_texts = "\n".join([
-            f"- Rating: {r.get('rating', 'N/A')}/5 | {r.get('sentiment', 'unknown')}: {r.get('text', '')[:300]}"
-            for r in review_sample
+            f"- {r.get('rating', 'N/A')}/5{f' (x{n})' if n > 1 else ''}: {r.get('text', '')[:SUMMARY_REVIEW_CHARS]}"
+            for r, n in batch
         ])
-        
-        prompt = f"""Analyze these customer reviews for "{product_name}" and provide:
-
-1. **Executive Summary** (2-3 sentences): Overall product perception
-2. **Key Strengths** (bullet points): What customers love most
-3. **Key Weaknesses** (bullet points): Common complaints
-4. **Purchase Recommendation**: Should someone buy this? Why/why not?
-5. **Suggested Improvements**: What should the manufacturer improve?
+        prompt = f"""Product: "{product_name}"
 
 Reviews:
-{review_texts}
-
-Provide a helpful, balanced analysis."""
-
+{review_texts}"""
+        async with slots:
+            content = await self._chat(
+                BATCH_SUMMARY_SYSTEM,
+                prompt,
+                temperature=0.3,
+                max_tokens=400,
+                response_format={"type": "json_object"}
+            )
+        points = orjson.loads(content)
+        return points if isinstance(points, dict) else {}
+    
+    async def generate_batch_summary(
+        self,
+        reviews: Sequence[Dict],
+        product_name: str,
+        batch_size: int = BATCH_SUMMARY_SIZE
+    ) -> Dict:
+        """
+        Summarize every review rather than a sample: reviews are sent
+        batch_size per prompt, at most 8 prompts at a time, each answered
+        as JSON, and the batches' points are merged. Identical review texts
+        are sent once, with their count.
+        
+        Args:
+            reviews: Sequence of review dictionaries with text and rating
+            product_name: Name of the product
+            batch_size: Distinct reviews per prompt
+            
+        Returns:
+            Per-batch summaries plus merged strengths, weaknesses and
+            improvements
+        """
+        if not self.api_key:
+            return {
+                "error": "Groq API key not configured",
+                "summary": None
+            }
+        
+        slots = asyncio.Semaphore(BATCH_SUMMARY_CONCURRENCY)
+        unique = _unique_reviews(reviews)
+        batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    self.base_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "You are an expert product analyst. Provide concise, actionable insights from customer reviews. Be balanced and helpful."
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "temperature": 0.7,
-                        "max_tokens": 1000
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    ai_response = data["choices"][0]["message"]["content"]
-                    
-                    return {
-                        "summary": ai_response,
-                        "model": self.model,
-                        "reviews_analyzed": len(review_sample),
-                        "error": None
-                    }
-                else:
-                    error_detail = response.text
-                    logger.error(f"Groq API error {response.status_code}: {error_detail}")
-                    return {
-                        "error": f"Groq API error: {response.status_code} - {error_detail[:200]}",
-                        "summary": None,
-                        "details": error_detail
-                    }
-                    
+            parts = await asyncio.gather(*(
+                self._summarize_batch(batch, product_name, slots) for batch in batches
+            ))
+        except httpx.TimeoutException:
+            return {
+                "error": "timeout",
+                "summary": None
+            }
+        except GroqAPIError as e:
+            logger.error(f"Groq API error {e.status_code}: {e.detail}")
+            return {
+                "error": f"Groq API error: {e.status_code} - {e.detail[:200]}",
+                "summary": None,
+                "details": e.detail
+            }
         except Exception as e:
             return {
                 "error": str(e),
                 "summary": None
             }
+        
+        result = {
+            "summary": [part.get("summary") for part in parts if isinstance(part.get("summary"), str)],
+            "model": self.model,
+            "reviews_analyzed": len(reviews),
+            "unique_reviews": len(unique),
+            "batches": len(batches),
+            "error": None
+        }
+        for field in BATCH_SUMMARY_LISTS:
+            result[field] = _merge_points(part.get(field) for part in parts)
+        return result
     
     async def generate_aspect_deep_dive(self, aspect: str, reviews: List[Dict], product_name: str) -> Dict:
         """
@@ -117,7 +532,7 @@ Provide a helpful, balanced analysis."""
             return {"error": "Groq API key not configured"}
         
         # Filter reviews mentioning the aspect
-        aspect_reviews = [r for r in reviews if aspect.lower() in r.get('text', '').lower()][:15]
+        aspect_reviews = [r for r in reviews if aspect.lower() in r.get('text', '').lower()][:ASPECT_DIVE_REVIEWS]
         
         if not aspect_reviews:
             return {"summary": f"No reviews specifically mention {aspect}.", "error": None}
@@ -127,51 +542,32 @@ Provide a helpful, balanced analysis."""
             for r in aspect_reviews
         ])
         
-        prompt = f"""Analyze what customers say about "{aspect}" for "{product_name}":
+        prompt = f"""Product: "{product_name}"
+Aspect: "{aspect}"
 
 Reviews mentioning {aspect}:
-{review_texts}
-
-Provide:
-1. Overall sentiment about {aspect}
-2. Specific praise (if any)
-3. Specific complaints (if any)
-4. Comparison to expectations
-
-Keep it concise (3-4 sentences max)."""
+{review_texts}"""
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    self.base_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": "You are a product analyst. Be concise and helpful."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.7,
-                        "max_tokens": 500
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "aspect": aspect,
-                        "summary": data["choices"][0]["message"]["content"],
-                        "reviews_analyzed": len(aspect_reviews),
-                        "error": None
-                    }
-                else:
-                    return {"error": f"Groq API error: {response.status_code}"}
-                    
+            summary = await self._chat(
+                ASPECT_DIVE_SYSTEM,
+                prompt,
+                temperature=0.7,
+                max_tokens=500
+            )
+        except httpx.TimeoutException:
+            return {"error": "timeout"}
+        except GroqAPIError as e:
+            return {"error": f"Groq API error: {e.status_code}"}
         except Exception as e:
             return {"error": str(e)}
+        
+        return {
+            "aspect": aspect,
+            "summary": summary,
+            "reviews_analyzed": len(aspect_reviews),
+            "error": None
+        }
     
     async def suggest_response_to_review(self, review_text: str, sentiment: str) -> Dict:
         """
@@ -180,44 +576,27 @@ Keep it concise (3-4 sentences max)."""
         if not self.api_key:
             return {"error": "Groq API key not configured"}
         
-        prompt = f"""A customer left this {sentiment} review:
-"{review_text}"
-
-Write a professional, empathetic seller response (2-3 sentences) that:
-- Thanks the customer
-- Addresses their specific points
-- Offers help if negative, appreciation if positive"""
+        prompt = f'A customer left this {sentiment} review:\n"{review_text}"'
 
         try:
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                response = await client.post(
-                    self.base_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": "You are a professional customer service representative."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.8,
-                        "max_tokens": 200
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "suggested_response": data["choices"][0]["message"]["content"],
-                        "error": None
-                    }
-                else:
-                    return {"error": f"Groq API error: {response.status_code}"}
-                    
+            suggested = await self._chat(
+                SELLER_RESPONSE_SYSTEM,
+                prompt,
+                temperature=0.8,
+                max_tokens=200,
+                max_read_timeout=20.0
+            )
+        except httpx.TimeoutException:
+            return {"error": "timeout"}
+        except GroqAPIError as e:
+            return {"error": f"Groq API error: {e.status_code}"}
         except Exception as e:
             return {"error": str(e)}
+        
+        return {
+            "suggested_response": suggested,
+            "error": None
+        }
 
 
 # Singleton instance
@@ -0,0 +1,35 @@
+"""In-process exact-match cache for LLM completions."""
+import hashlib
+import threading
+from typing import Optional
+
+import orjson
+from cachetools import TTLCache
+
+
+class LLMCache:
+    """
+    Completion texts keyed by a SHA-256 of the full request
+    (model, messages and sampling parameters).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 3600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(payload: dict) -> str:
+        """Stable key for a chat completion request body."""
+        return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
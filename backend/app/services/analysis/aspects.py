@@ -2,59 +2,98 @@
 import asyncio
 import re
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
 from collections import defaultdict
 
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 
 from app.models import Review, ReviewAspect
-from app.services.analysis.sentiment import analyze_text
+from app.services.analysis.sentiment import analyze_texts_batch
 
 # Aspect keywords mapping
 ASPECT_KEYWORDS = {
-    "quality": [
+    "quality": (
         "quality", "build", "material", "sturdy", "durable", "cheap", "solid",
         "construction", "craftsmanship", "well-made", "poorly-made", "flimsy"
-    ],
-    "price": [
+    ),
+    "price": (
         "price", "cost", "expensive", "cheap", "worth", "value", "money",
         "affordable", "overpriced", "budget", "bargain", "deal"
-    ],
-    "delivery": [
+    ),
+    "delivery": (
         "delivery", "shipping", "arrived", "package", "packaging", "damaged",
         "late", "early", "on-time", "delayed", "courier", "dispatch"
-    ],
-    "battery": [
+    ),
+    "battery": (
         "battery", "charge", "charging", "lasting", "backup", "drain",
         "power", "mah", "hours", "overnight"
-    ],
-    "design": [
+    ),
+    "design": (
         "design", "look", "looks", "appearance", "color", "colour", "aesthetic",
         "sleek", "beautiful", "ugly", "style", "stylish", "compact", "slim"
-    ],
-    "performance": [
+    ),
+    "performance": (
         "performance", "speed", "fast", "slow", "lag", "smooth", "responsive",
         "quick", "snappy", "hangs", "freezes", "crash"
-    ],
-    "camera": [
+    ),
+    "camera": (
         "camera", "photo", "photos", "picture", "pictures", "selfie", "video",
         "lens", "zoom", "focus", "blur", "clarity"
-    ],
-    "display": [
+    ),
+    "display": (
         "display", "screen", "resolution", "brightness", "visibility", "panel",
         "lcd", "amoled", "oled", "hd", "touch"
-    ],
-    "sound": [
+    ),
+    "sound": (
         "sound", "audio", "speaker", "volume", "bass", "music", "loud",
         "clear", "noise", "earphone", "headphone"
-    ],
-    "customer_service": [
+    ),
+    "customer_service": (
         "service", "support", "response", "help", "complaint", "warranty",
         "return", "refund", "replacement", "customer care"
-    ]
+    )
 }
 
 
+# Position of each sentiment label in _AspectTally.counts
+LABEL_INDEX = {"positive": 0, "negative": 1, "neutral": 2}
+
+
+class _AspectTally:
+    """Running mention counts, score and sample sentences for one aspect."""
+    __slots__ = ("counts", "total_score", "positive_samples", "negative_samples")
+    
+    def __init__(self):
+        self.counts = [0, 0, 0]
+        self.total_score = 0.0
+        self.positive_samples: List[str] = []
+        self.negative_samples: List[str] = []
+
+
+def _build_keyword_index():
+    """
+    Map every keyword to the aspects it signals and compile all keywords into
+    one longest-first, whole-word alternation ("cheap" does not match "cheaply").
+    """
+    keyword_aspects = defaultdict(set)
+    for aspect, keywords in ASPECT_KEYWORDS.items():
+        for keyword in keywords:
+            keyword_aspects[keyword].add(aspect)
+    index = {keyword: frozenset(aspects) for keyword, aspects in keyword_aspects.items()}
+    alternation = "|".join(map(re.escape, sorted(index, key=len, reverse=True)))
+    # Lookahead: report a match at every position, so overlapping keywords are found
+    return index, re.compile(rf"(?=\b({alternation})\b)")
+
+
+KEYWORD_ASPECTS, KEYWORD_RE = _build_keyword_index()
+
+
+def find_aspects(sentence: str) -> FrozenSet[str]:
+    """All aspects whose keywords occur in a sentence, in one scan."""
+    return frozenset().union(*(KEYWORD_ASPECTS[m] for m in KEYWORD_RE.findall(sentence.lower())))
+
+
 def extract_sentences(text: str) -> List[str]:
     """Split text into sentences."""
     # Simple sentence splitting
@@ -62,30 +101,26 @@ def extract_sentences(text: str) -> List[str]:
     return [s.strip() for s in sentences if s.strip() and len(s.strip()) > 10]
 
 
-def find_aspect_in_text(text: str, aspect: str, keywords: List[str]) -> List[str]:
+def find_aspect_in_text(text: str, aspect: str, keywords: Tuple[str, ...]) -> List[str]:
     """Find sentences mentioning an aspect."""
-    text_lower = text.lower()
-    sentences = extract_sentences(text)
-    
-    matching_sentences = []
-    for sentence in sentences:
-        sentence_lower = sentence.lower()
-        for keyword in keywords:
-            if keyword in sentence_lower:
-                matching_sentences.append(sentence)
-                break
-    
-    return matching_sentences
+    return [sentence for sentence in extract_sentences(text) if aspect in find_aspects(sentence)]
 
 
-async def analyze_product_aspects(db: Session, product_id: int) -> Dict:
+async def analyze_product_aspects(db: Session, product_id: int, reviews: Optional[Sequence] = None) -> Dict:
     """
     Perform aspect-based sentiment analysis.
     
+    Args:
+        reviews: The product's review rows (with id and review_text), if
+            the caller already loaded them
+    
     Returns:
         Dictionary with aspect sentiments
     """
-    reviews = db.query(Review).filter(Review.product_id == product_id).all()
+    if reviews is None:
+        reviews = db.execute(
+            select(Review.id, Review.review_text).where(Review.product_id == product_id)
+        ).all()
     
     if not reviews:
         return {
@@ -94,59 +129,78 @@ async def analyze_product_aspects(db: Session, product_id: int) -> Dict:
             "analyzed_at": datetime.utcnow().isoformat()
         }
     
-    # Clear existing aspects
-    db.query(ReviewAspect).filter(
-        ReviewAspect.review_id.in_([r.id for r in reviews])
-    ).delete(synchronize_session=False)
-    
-    # Aggregate aspect data
-    aspect_data = defaultdict(lambda: {
-        "positive": 0, "negative": 0, "neutral": 0,
-        "total_score": 0, "count": 0,
-        "positive_samples": [], "negative_samples": []
-    })
+    # Aggregate aspect data, in first-mentioned order
+    aspect_data: Dict[str, _AspectTally] = {}
     
+    # Pass 1: split and scan each sentence once, for all aspects
+    review_sentences = []
+    sentence_index = {}
     for review in reviews:
-        for aspect, keywords in ASPECT_KEYWORDS.items():
-            matching_sentences = find_aspect_in_text(review.review_text, aspect, keywords)
-            
-            for sentence in matching_sentences:
-                # Analyze sentiment of the specific sentence
-                label, score = await asyncio.to_thread(analyze_text, sentence)
+        sentence_aspects = [
+            (sentence, aspects)
+            for sentence in extract_sentences(review.review_text)
+            if (aspects := find_aspects(sentence))
+        ]
+        for sentence, _ in sentence_aspects:
+            sentence_index.setdefault(sentence, len(sentence_index))
+        review_sentences.append((review.id, sentence_aspects))
+    
+    # Pass 2: classify every distinct matching sentence in batched model calls
+    sentiments = []
+    if sentence_index:
+        sentiments = await asyncio.to_thread(analyze_texts_batch, list(sentence_index))
+    
+    # Pass 3: record and aggregate, per review in aspect order
+    aspect_rows = []
+    for review_id, sentence_aspects in review_sentences:
+        for aspect in ASPECT_KEYWORDS:
+            for sentence, aspects in sentence_aspects:
+                if aspect not in aspects:
+                    continue
                 
-                # Store aspect in database
-                aspect_record = ReviewAspect(
-                    review_id=review.id,
-                    aspect_name=aspect,
-                    sentiment=label,
-                    sentiment_score=score,
-                    mentioned_text=sentence[:500]
-                )
-                db.add(aspect_record)
+                label, score = sentiments[sentence_index[sentence]]
+                
+                aspect_rows.append({
+                    "review_id": review_id,
+                    "aspect_name": aspect,
+                    "sentiment": label,
+                    "sentiment_score": score,
+                    "mentioned_text": sentence[:500]
+                })
                 
                 # Aggregate
-                data = aspect_data[aspect]
-                data[label] += 1
-                data["count"] += 1
+                data = aspect_data.get(aspect)
+                if data is None:
+                    data = aspect_data[aspect] = _AspectTally()
+                label_index = LABEL_INDEX[label]
+                data.counts[label_index] += 1
                 
-                if label == "positive":
-                    data["total_score"] += score
-                    if len(data["positive_samples"]) < 3:
-                        data["positive_samples"].append(sentence[:200])
-                elif label == "negative":
-                    data["total_score"] -= score
-                    if len(data["negative_samples"]) < 3:
-                        data["negative_samples"].append(sentence[:200])
+                if label_index == 0:
+                    data.total_score += score
+                    if len(data.positive_samples) < 3:
+                        data.positive_samples.append(sentence[:200])
+                elif label_index == 1:
+                    data.total_score -= score
+                    if len(data.negative_samples) < 3:
+                        data.negative_samples.append(sentence[:200])
     
+    # Replace existing aspects; the write transaction only starts here, after
+    # inference, so other sessions can write while the model runs
+    db.query(ReviewAspect).filter(
+        ReviewAspect.review_id.in_([review.id for review in reviews])
+    ).delete(synchronize_session=False)
+    # Store all aspects with one executemany INSERT
+    if aspect_rows:
+        db.execute(insert(ReviewAspect), aspect_rows)
     db.commit()
     
     # Build response
     aspects = []
     for aspect, data in aspect_data.items():
-        if data["count"] == 0:
-            continue
+        positive_count, negative_count, neutral_count = data.counts
+        count = positive_count + negative_count + neutral_count
         
-        avg_score = data["total_score"] / data["count"]
+        avg_score = data.total_score / count
         # Normalize to 0-1
         normalized_score = (avg_score + 1) / 2
         
@@ -161,12 +215,12 @@ async def analyze_product_aspects(db: Session, product_id: int) -> Dict:
             "aspect_name": aspect,
             "sentiment_label": sentiment_label,
             "average_score": round(normalized_score, 3),
-            "positive_count": data["positive"],
-            "negative_count": data["negative"],
-            "neutral_count": data["neutral"],
-            "total_mentions": data["count"],
-            "sample_positive": data["positive_samples"],
-            "sample_negative": data["negative_samples"]
+            "positive_count": positive_count,
+            "negative_count": negative_count,
+            "neutral_count": neutral_count,
+            "total_mentions": count,
+            "sample_positive": data.positive_samples,
+            "sample_negative": data.negative_samples
         })
     
     # Sort by total mentions
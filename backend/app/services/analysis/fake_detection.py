@@ -1,9 +1,13 @@
 """Fake review detection service."""
+import asyncio
+import hashlib
+import random
 import re
 from datetime import datetime
-from typing import Dict, List
-from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from collections import Counter, defaultdict
 
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
 from app.models import Review
@@ -17,37 +21,82 @@ GENERIC_PHRASES = [
     "five stars", "one star", "5 stars", "1 star"
 ]
 
+# All generic phrases in one pass; the lookahead reports overlapping matches too
+GENERIC_RE = re.compile("(?=(" + "|".join(map(re.escape, GENERIC_PHRASES)) + "))")
 
-def calculate_suspicious_score(review: Review) -> int:
+URL_RE = re.compile(r'https?://')
+
+# Spam indicators in one alternation: URLs, seller praise, phone numbers
+SPAM_RE = re.compile(
+    r'https?://'
+    r'|\b(?:seller|shop|store)\s+(?:is|was)\s+(?:great|best|good)\b'
+    r'|\d{10}|\d{3}[-.\s]?\d{3}[-.\s]?\d{4}'
+)
+
+# Near-duplicate detection: 64-permutation MinHash, LSH with 16 bands of 4 rows
+DUPLICATE_THRESHOLD = 0.8
+_MINHASH_PERMS = 64
+_LSH_BANDS, _LSH_ROWS = 16, 4
+_MINHASH_PRIME = (1 << 61) - 1
+WORD_RE = re.compile(r"\w+")
+_rng = random.Random(0)
+_MINHASH_PERMUTATIONS = tuple(
+    (_rng.randrange(1, _MINHASH_PRIME), _rng.randrange(0, _MINHASH_PRIME))
+    for _ in range(_MINHASH_PERMS)
+)
+del _rng
+
+
+class ReviewFeatures(NamedTuple):
+    """Text signals used by the suspicion score, extracted in one pass per review."""
+    word_count: int
+    generic_count: int
+    caps_ratio: float
+    exclamation_count: int
+    has_spam: bool
+    has_url: bool
+
+
+def extract_features(review_text: str) -> ReviewFeatures:
+    """Compute every text signal of a review once."""
+    text = review_text.lower()
+    
+    return ReviewFeatures(
+        word_count=len(text.split()),
+        generic_count=len(set(GENERIC_RE.findall(text))),
+        caps_ratio=sum(map(str.isupper, review_text)) / max(len(review_text), 1),
+        exclamation_count=review_text.count('!'),
+        has_spam=SPAM_RE.search(text) is not None,
+        has_url=URL_RE.search(text) is not None
+    )
+
+
+def calculate_suspicious_score(features: ReviewFeatures, rating: int, verified_purchase: bool) -> int:
     """
     Calculate a suspicion score for a review (0-100).
     Higher score = more suspicious.
     """
     score = 0
-    text = review.review_text.lower()
-    word_count = len(text.split())
+    word_count = features.word_count
     
     # 1. Short reviews with extreme ratings (30 points)
-    if word_count < 10 and review.rating in [1, 5]:
+    if word_count < 10 and rating in [1, 5]:
         score += 30
-    elif word_count < 20 and review.rating in [1, 5]:
+    elif word_count < 20 and rating in [1, 5]:
         score += 15
     
     # 2. Unverified purchase (25 points)
-    if not review.verified_purchase:
+    if not verified_purchase:
         score += 25
     
     # 3. Generic phrases (20 points max)
-    generic_count = sum(1 for phrase in GENERIC_PHRASES if phrase in text)
-    score += min(20, generic_count * 5)
+    score += min(20, features.generic_count * 5)
     
     # 4. All caps or excessive punctuation (15 points)
-    caps_ratio = sum(1 for c in review.review_text if c.isupper()) / max(len(review.review_text), 1)
-    if caps_ratio > 0.5:
+    if features.caps_ratio > 0.5:
         score += 10
     
-    exclamation_count = review.review_text.count('!')
-    if exclamation_count > 3:
+    if features.exclamation_count > 3:
         score += 5
     
     # 5. Extremely short (10 points)
@@ -55,31 +104,62 @@ def calculate_suspicious_score(review: Review) -> int:
         score += 10
     
     # 6. Perfect rating with very short review (10 points)
-    if review.rating == 5 and word_count < 15:
+    if rating == 5 and word_count < 15:
         score += 10
     
     # 7. Contains spam indicators (10 points)
-    spam_patterns = [
-        r'http[s]?://',  # URLs
-        r'\b(seller|shop|store)\s+(is|was)\s+(great|best|good)\b',  # Seller praise
-        r'(\d{10}|\d{3}[-.\s]?\d{3}[-.\s]?\d{4})',  # Phone numbers
-    ]
-    for pattern in spam_patterns:
-        if re.search(pattern, text):
-            score += 10
-            break
+    if features.has_spam:
+        score += 10
     
     return min(100, score)
 
 
-async def detect_fake_reviews(db: Session, product_id: int) -> Dict:
+def score_reviews(reviews) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Score (id, text, rating, verified_purchase) rows.
+    
+    Returns:
+        Tuple of (score updates keyed by review id, suspicious review details)
+    """
+    suspicious_reviews = []
+    updates = []
+    
+    # Calculate suspicion score for each review
+    for review_id, review_text, rating, verified_purchase in reviews:
+        features = extract_features(review_text)
+        score = calculate_suspicious_score(features, rating, verified_purchase)
+        is_suspicious = score >= 50
+        updates.append({"id": review_id, "suspicious_score": score, "is_suspicious": is_suspicious})
+        
+        if is_suspicious:
+            suspicious_reviews.append({
+                "review_id": review_id,
+                "text": review_text[:200] + "..." if len(review_text) > 200 else review_text,
+                "rating": rating,
+                "suspicious_score": score,
+                "verified_purchase": verified_purchase,
+                "reasons": get_suspicion_reasons(features, rating, verified_purchase)
+            })
+    
+    return updates, suspicious_reviews
+
+
+async def detect_fake_reviews(db: Session, product_id: int, reviews: Optional[Sequence] = None) -> Dict:
     """
     Analyze reviews for suspicious patterns.
     
+    Args:
+        reviews: The product's (id, review_text, rating, verified_purchase)
+            rows, if the caller already loaded them
+    
     Returns:
         Dictionary with fake review analysis
     """
-    reviews = db.query(Review).filter(Review.product_id == product_id).all()
+    if reviews is None:
+        reviews = db.execute(
+            select(Review.id, Review.review_text, Review.rating, Review.verified_purchase)
+            .where(Review.product_id == product_id)
+        ).all()
     
     if not reviews:
         return {
@@ -91,24 +171,11 @@ async def detect_fake_reviews(db: Session, product_id: int) -> Dict:
             "analyzed_at": datetime.utcnow().isoformat()
         }
     
-    suspicious_reviews = []
-    
-    # Calculate suspicion score for each review
-    for review in reviews:
-        score = calculate_suspicious_score(review)
-        review.suspicious_score = score
-        review.is_suspicious = score >= 50
-        
-        if review.is_suspicious:
-            suspicious_reviews.append({
-                "review_id": review.id,
-                "text": review.review_text[:200] + "..." if len(review.review_text) > 200 else review.review_text,
-                "rating": review.rating,
-                "suspicious_score": score,
-                "verified_purchase": review.verified_purchase,
-                "reasons": get_suspicion_reasons(review, score)
-            })
+    # Scoring is pure CPU work: keep it off the event loop
+    updates, suspicious_reviews = await asyncio.to_thread(score_reviews, reviews)
     
+    # One executemany UPDATE by primary key
+    db.execute(update(Review), updates)
     db.commit()
     
     # Sort by suspicion score
@@ -126,66 +193,113 @@ async def detect_fake_reviews(db: Session, product_id: int) -> Dict:
     }
 
 
-def get_suspicion_reasons(review: Review, score: int) -> List[str]:
+def get_suspicion_reasons(features: ReviewFeatures, rating: int, verified_purchase: bool) -> List[str]:
     """Get human-readable reasons why a review is suspicious."""
     reasons = []
-    text = review.review_text.lower()
-    word_count = len(text.split())
+    word_count = features.word_count
     
-    if not review.verified_purchase:
+    if not verified_purchase:
         reasons.append("Not a verified purchase")
     
-    if word_count < 10 and review.rating in [1, 5]:
+    if word_count < 10 and rating in [1, 5]:
         reasons.append("Very short review with extreme rating")
     
-    generic_count = sum(1 for phrase in GENERIC_PHRASES if phrase in text)
-    if generic_count >= 2:
+    if features.generic_count >= 2:
         reasons.append("Contains generic/common phrases")
     
     if word_count < 5:
         reasons.append("Extremely short review")
     
-    if re.search(r'http[s]?://', text):
+    if features.has_url:
         reasons.append("Contains URLs")
     
     return reasons if reasons else ["Multiple minor suspicious indicators"]
 
 
+def duplicate_key(text: str) -> Optional[str]:
+    """Templated-review fingerprint: first and last 3 words (None for reviews under 5 words)."""
+    words = text.lower().split()
+    if len(words) < 5:
+        return None
+    return " ".join(words[:3]) + " ... " + " ".join(words[-3:])
+
+
+def _minhash_signature(text: str) -> Optional[Tuple[int, ...]]:
+    """MinHash signature over the 3-word shingles of a review (None for reviews under 5 words)."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < 5:
+        return None
+    hashes = {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + 3]).encode(), digest_size=8).digest(), "big")
+        for i in range(len(words) - 2)
+    }
+    return tuple(min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in _MINHASH_PERMUTATIONS)
+
+
 async def check_duplicate_reviews(db: Session, product_id: int) -> List[Dict]:
     """
-    Find potential duplicate or templated reviews.
+    Find near-duplicate or templated reviews with MinHash + LSH: reviews whose
+    shingle sets have an estimated Jaccard similarity >= DUPLICATE_THRESHOLD
+    are grouped (transitively).
     
     Returns:
         List of suspected duplicate groups
     """
-    reviews = db.query(Review).filter(Review.product_id == product_id).all()
+    reviews = db.execute(
+        select(Review.id, Review.review_text)
+        .where(Review.product_id == product_id)
+        .order_by(Review.id)
+    ).all()
     
     if len(reviews) < 10:
         return []
     
-    # Simple approach: find reviews with very similar first/last words
-    text_groups = {}
-    
-    for review in reviews:
-        words = review.review_text.lower().split()
-        if len(words) >= 5:
-            # Key based on first and last 3 words
-            key = " ".join(words[:3]) + " ... " + " ".join(words[-3:])
-            if key not in text_groups:
-                text_groups[key] = []
-            text_groups[key].append({
-                "review_id": review.id,
-                "text": review.review_text[:100]
-            })
+    signatures = {}
+    for review_id, review_text in reviews:
+        signature = _minhash_signature(review_text)
+        if signature is not None:
+            signatures[review_id] = signature
+    
+    # LSH: reviews sharing any band of their signature become candidate pairs
+    buckets = defaultdict(list)
+    for review_id, signature in signatures.items():
+        for band in range(_LSH_BANDS):
+            buckets[band, signature[band * _LSH_ROWS:(band + 1) * _LSH_ROWS]].append(review_id)
+    
+    # Union-find over candidate pairs that pass the similarity check
+    parent = {review_id: review_id for review_id in signatures}
+    
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    
+    for bucket in buckets.values():
+        for i, first in enumerate(bucket):
+            for other in bucket[i + 1:]:
+                if find(first) == find(other):
+                    continue
+                a, b = signatures[first], signatures[other]
+                if sum(x == y for x, y in zip(a, b)) / _MINHASH_PERMS >= DUPLICATE_THRESHOLD:
+                    parent[find(other)] = find(first)
+    
+    texts = dict(reviews)
+    groups = defaultdict(list)
+    for review_id in signatures:
+        groups[find(review_id)].append(review_id)
     
     # Find groups with duplicates
     duplicates = []
-    for key, group in text_groups.items():
+    for group in groups.values():
         if len(group) >= 2:
             duplicates.append({
-                "pattern": key,
+                "pattern": duplicate_key(texts[group[0]]),
                 "count": len(group),
-                "reviews": group[:5]
+                "reviews": [
+                    {"review_id": review_id, "text": texts[review_id][:100]}
+                    for review_id in group[:5]
+                ]
             })
     
     return sorted(duplicates, key=lambda x: x["count"], reverse=True)[:5]
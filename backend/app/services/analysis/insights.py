@@ -1,13 +1,50 @@
 """Insights generator - aggregates all analysis into key findings."""
+import re
 from datetime import datetime
 from typing import Dict
 from collections import Counter
 
+from sqlalchemy import case, func, select, true
 from sqlalchemy.orm import Session
 
 from app.models import Product, Review
 
 
+# Keyword extraction: lowercase word tokens of 3+ characters
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9'-]{2,}")
+
+# Stopwords and common words to exclude
+STOPWORDS = frozenset({
+    "the", "a", "an", "is", "are", "was", "were", "be", "been", "being",
+    "have", "has", "had", "do", "does", "did", "will", "would", "could",
+    "should", "may", "might", "must", "shall", "can", "need", "dare",
+    "ought", "used", "to", "of", "in", "for", "on", "with", "at", "by",
+    "from", "as", "into", "through", "during", "before", "after", "above",
+    "below", "between", "under", "again", "further", "then", "once", "here",
+    "there", "when", "where", "why", "how", "all", "each", "every", "both",
+    "few", "more", "most", "other", "some", "such", "no", "nor", "not",
+    "only", "own", "same", "so", "than", "too", "very", "just", "also",
+    "and", "but", "or", "if", "because", "while", "although", "this",
+    "that", "these", "those", "i", "me", "my", "we", "our", "you", "your",
+    "he", "she", "it", "they", "them", "its", "product", "amazon", "flipkart",
+    "buy", "bought", "one", "get", "got", "use", "using", "like", "really",
+    "much", "even", "still", "well", "back", "time", "thing", "things"
+})
+
+# Positive/negative specific keywords to highlight
+POSITIVE_TERMS = frozenset({
+    "excellent", "amazing", "awesome", "fantastic", "wonderful", "perfect",
+    "great", "love", "best", "superb", "brilliant", "outstanding", "incredible",
+    "smooth", "fast", "beautiful", "comfortable", "reliable", "durable"
+})
+
+NEGATIVE_TERMS = frozenset({
+    "terrible", "horrible", "awful", "poor", "bad", "worst", "disappointing",
+    "broken", "defective", "cheap", "slow", "waste", "useless", "damaged",
+    "fake", "faulty", "unreliable", "uncomfortable", "fragile"
+})
+
+
 async def generate_product_insights(db: Session, product_id: int) -> Dict:
     """
     Generate comprehensive insights summary for a product.
@@ -15,21 +52,40 @@ async def generate_product_insights(db: Session, product_id: int) -> Dict:
     Returns:
         Dictionary with key insights and findings
     """
+    return build_product_insights(db, product_id)
+
+
+def build_product_insights(db: Session, product_id: int) -> Dict:
+    """
+    Blocking body of generate_product_insights(), for callers already
+    running in a worker thread (it only runs queries and aggregates).
+    """
     # Get product
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    if db.scalar(select(Product.id).where(Product.id == product_id)) is None:
         raise ValueError(f"Product {product_id} not found")
     
-    # Get all reviews
-    reviews = db.query(Review).filter(Review.product_id == product_id).all()
-    
-    if not reviews:
+    of_product = Review.product_id == product_id
+    
+    # Counts per (rating, sentiment) in SQL, instead of loading every review
+    groups = db.execute(
+        select(
+            Review.rating,
+            Review.sentiment_label,
+            func.count(),
+            func.sum(case((Review.is_suspicious == true(), 1), else_=0))
+        )
+        .where(of_product)
+        .group_by(Review.rating, Review.sentiment_label)
+    ).all()
+    
+    if not groups:
         return {
             "product_id": product_id,
             "overall_score": 50.0,
             "total_reviews": 0,
             "avg_rating": 0.0,
             "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
+            "rating_percentages": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
             "sentiment_distribution": {
                 "positive": 0, "negative": 0, "neutral": 0,
                 "positive_percent": 0, "negative_percent": 0, "neutral_percent": 0
@@ -43,12 +99,27 @@ async def generate_product_insights(db: Session, product_id: int) -> Dict:
             "analyzed_at": datetime.utcnow().isoformat()
         }
     
+    rating_dist = Counter()
+    sentiment_dist = Counter()
+    total_reviews = 0
+    rating_sum = 0
+    fake_count = 0
+    for rating, label, count, suspicious in groups:
+        rating_dist[rating] += count
+        if label:
+            sentiment_dist[label] += count
+        total_reviews += count
+        rating_sum += rating * count
+        fake_count += suspicious or 0
+    
     # Calculate rating distribution
-    rating_dist = Counter(r.rating for r in reviews)
     rating_distribution = {i: rating_dist.get(i, 0) for i in range(1, 6)}
+    rating_percentages = {
+        i: round(count / total_reviews * 100, 1) if total_reviews else 0
+        for i, count in rating_distribution.items()
+    }
     
     # Calculate sentiment distribution
-    sentiment_dist = Counter(r.sentiment_label for r in reviews if r.sentiment_label)
     total_analyzed = sum(sentiment_dist.values())
     
     sentiment_distribution = {
@@ -61,7 +132,7 @@ async def generate_product_insights(db: Session, product_id: int) -> Dict:
     }
     
     # Calculate overall score (weighted average of sentiment and ratings)
-    avg_rating = sum(r.rating for r in reviews) / len(reviews)
+    avg_rating = rating_sum / total_reviews
     rating_score = (avg_rating / 5) * 100
     
     sentiment_score = 50.0
@@ -73,46 +144,44 @@ async def generate_product_insights(db: Session, product_id: int) -> Dict:
     # Weighted: 60% sentiment, 40% rating
     overall_score = sentiment_score * 0.6 + rating_score * 0.4
     
+    # Ranking of positive/negative reviews (most confident first); the top 5
+    # are displayed, and keyword counting follows the same order
+    confidence = func.coalesce(Review.sentiment_score, 0).desc()
+    positive = (
+        select(Review.id, Review.review_text, Review.rating, Review.sentiment_score)
+        .where(of_product, Review.sentiment_label == "positive")
+        .order_by(confidence, Review.rating.desc(), Review.id)
+    )
+    negative = (
+        select(Review.id, Review.review_text, Review.rating, Review.sentiment_score)
+        .where(of_product, Review.sentiment_label == "negative")
+        .order_by(confidence, Review.rating, Review.id)
+    )
+    
     # Get top positive reviews
-    positive_reviews = [r for r in reviews if r.sentiment_label == "positive"]
-    positive_reviews.sort(key=lambda r: (r.sentiment_score or 0, r.rating), reverse=True)
-    top_positive = [
-        {
-            "id": r.id,
-            "text": r.review_text[:300] + "..." if len(r.review_text) > 300 else r.review_text,
-            "rating": r.rating,
-            "sentiment_score": float(r.sentiment_score) if r.sentiment_score else None
-        }
-        for r in positive_reviews[:5]
-    ]
+    top_positive = [_review_summary(r) for r in db.execute(positive.limit(5))]
     
     # Get top negative reviews
-    negative_reviews = [r for r in reviews if r.sentiment_label == "negative"]
-    negative_reviews.sort(key=lambda r: (r.sentiment_score or 0, -r.rating), reverse=True)
-    top_negative = [
-        {
-            "id": r.id,
-            "text": r.review_text[:300] + "..." if len(r.review_text) > 300 else r.review_text,
-            "rating": r.rating,
-            "sentiment_score": float(r.sentiment_score) if r.sentiment_score else None
-        }
-        for r in negative_reviews[:5]
-    ]
+    top_negative = [_review_summary(r) for r in db.execute(negative.limit(5))]
     
-    # Extract common words from positive/negative reviews
-    common_praises = extract_common_keywords(positive_reviews, positive=True)
-    common_complaints = extract_common_keywords(negative_reviews, positive=False)
+    # Extract common words from positive/negative reviews (texts only)
+    common_praises = extract_common_keywords(
+        db.execute(positive.with_only_columns(Review.review_text)), positive=True
+    )
+    common_complaints = extract_common_keywords(
+        db.execute(negative.with_only_columns(Review.review_text)), positive=False
+    )
     
     # Count fake reviews
-    fake_count = sum(1 for r in reviews if r.is_suspicious)
-    fake_percent = round(fake_count / len(reviews) * 100, 1)
+    fake_percent = round(fake_count / total_reviews * 100, 1)
     
     return {
         "product_id": product_id,
         "overall_score": round(overall_score, 2),
-        "total_reviews": len(reviews),
+        "total_reviews": total_reviews,
         "avg_rating": round(avg_rating, 2),
         "rating_distribution": rating_distribution,
+        "rating_percentages": rating_percentages,
         "sentiment_distribution": sentiment_distribution,
         "top_positive_reviews": top_positive,
         "top_negative_reviews": top_negative,
@@ -124,54 +193,28 @@ async def generate_product_insights(db: Session, product_id: int) -> Dict:
     }
 
 
+def _review_summary(r) -> Dict:
+    """Display form of a top review row."""
+    return {
+        "id": r.id,
+        "text": r.review_text[:300] + "..." if len(r.review_text) > 300 else r.review_text,
+        "rating": r.rating,
+        "sentiment_score": float(r.sentiment_score) if r.sentiment_score else None
+    }
+
+
 def extract_common_keywords(reviews, positive: bool = True, top_n: int = 10):
     """Extract common meaningful keywords from reviews."""
-    # Stopwords and common words to exclude
-    stopwords = {
-        "the", "a", "an", "is", "are", "was", "were", "be", "been", "being",
-        "have", "has", "had", "do", "does", "did", "will", "would", "could",
-        "should", "may", "might", "must", "shall", "can", "need", "dare",
-        "ought", "used", "to", "of", "in", "for", "on", "with", "at", "by",
-        "from", "as", "into", "through", "during", "before", "after", "above",
-        "below", "between", "under", "again", "further", "then", "once", "here",
-        "there", "when", "where", "why", "how", "all", "each", "every", "both",
-        "few", "more", "most", "other", "some", "such", "no", "nor", "not",
-        "only", "own", "same", "so", "than", "too", "very", "just", "also",
-        "and", "but", "or", "if", "because", "while", "although", "this",
-        "that", "these", "those", "i", "me", "my", "we", "our", "you", "your",
-        "he", "she", "it", "they", "them", "its", "product", "amazon", "flipkart",
-        "buy", "bought", "one", "get", "got", "use", "using", "like", "really",
-        "much", "even", "still", "well", "back", "time", "thing", "things"
-    }
-    
-    # Positive/negative specific keywords to highlight
-    positive_terms = {
-        "excellent", "amazing", "awesome", "fantastic", "wonderful", "perfect",
-        "great", "love", "best", "superb", "brilliant", "outstanding", "incredible",
-        "smooth", "fast", "beautiful", "comfortable", "reliable", "durable"
-    }
-    
-    negative_terms = {
-        "terrible", "horrible", "awful", "poor", "bad", "worst", "disappointing",
-        "broken", "defective", "cheap", "slow", "waste", "useless", "damaged",
-        "fake", "faulty", "unreliable", "uncomfortable", "fragile"
-    }
-    
     word_counts = Counter()
-    target_terms = positive_terms if positive else negative_terms
-    
     for review in reviews:
-        words = review.review_text.lower().split()
-        # Clean words
-        words = [w.strip('.,!?";:()[]{}') for w in words]
-        words = [w for w in words if len(w) > 2 and w not in stopwords]
-        
-        # Boost target terms
-        for word in words:
-            if word in target_terms:
-                word_counts[word] += 3
-            else:
-                word_counts[word] += 1
+        word_counts.update(
+            word for word in TOKEN_RE.findall(review.review_text.lower()) if word not in STOPWORDS
+        )
+    
+    # Boost target terms (each mention counts 3x)
+    for term in POSITIVE_TERMS if positive else NEGATIVE_TERMS:
+        if term in word_counts:
+            word_counts[term] *= 3
     
     # Get top keywords
     return [word for word, _ in word_counts.most_common(top_n)]
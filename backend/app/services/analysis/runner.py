@@ -1,8 +1,34 @@
 """Analysis runner - orchestrates all analysis services."""
+import asyncio
+import hashlib
 from datetime import datetime
+from typing import Dict
 
+from sqlalchemy import delete, select, update
+
+from app.config import get_settings
 from app.database import SessionLocal
-from app.models import Product
+from app.middleware import invalidate_product_cache
+from app.models import AnalysisCache, Product, Review
+
+settings = get_settings()
+
+# Caps how many pipelines run at once, so analysis can't starve request handling
+_analysis_slots = asyncio.Semaphore(settings.max_concurrent_analyses)
+
+# Runs that are waiting for a slot, per product; later requests join them
+_queued: Dict[int, asyncio.Task] = {}
+
+# AnalysisCache entry holding the hash of the reviews the last complete run saw
+PIPELINE_CACHE_TYPE = "pipeline"
+
+
+def reviews_hash(reviews) -> str:
+    """Digest of everything the stages read from each review, in id order."""
+    digest = hashlib.blake2b(digest_size=16)
+    for r in sorted(reviews, key=lambda r: r.id):
+        digest.update(f"{r.id}\x1f{r.rating}\x1f{bool(r.verified_purchase)}\x1f{r.review_text}\x1e".encode())
+    return digest.hexdigest()
 
 
 async def run_complete_analysis(product_id: int):
@@ -14,7 +40,45 @@ async def run_complete_analysis(product_id: int):
     2. Aspect-based sentiment
     3. Topic modeling
     4. Fake review detection
+    
+    The run is skipped when the product's reviews are exactly those the
+    last complete run analyzed (clearing the product's analysis cache, as
+    /reanalyze does, forces a fresh run).
+    
+    At most ``max_concurrent_analyses`` pipelines run at a time. A request
+    for a product that already has a run waiting for a slot joins that run
+    instead of queueing a duplicate (the waiting run has not read any data
+    yet, so it will see everything committed so far).
     """
+    task = _queued.get(product_id)
+    if task is None:
+        task = asyncio.ensure_future(_run_when_slot_free(product_id))
+        _queued[product_id] = task
+    await asyncio.shield(task)
+
+
+async def _run_when_slot_free(product_id: int):
+    """Wait for a free slot, then run the pipeline."""
+    try:
+        async with _analysis_slots:
+            _queued.pop(product_id, None)
+            await _run_pipeline(product_id)
+    finally:
+        if _queued.get(product_id) is asyncio.current_task():
+            _queued.pop(product_id, None)
+
+
+async def with_session(stage, product_id: int, **kwargs):
+    """Run an analysis stage in a session of its own, for stages run concurrently."""
+    db = SessionLocal()
+    try:
+        return await stage(db, product_id, **kwargs)
+    finally:
+        db.close()
+
+
+async def _run_pipeline(product_id: int):
+    """Run every analysis stage for a product in its own session."""
     db = SessionLocal()
     
     try:
@@ -24,34 +88,66 @@ async def run_complete_analysis(product_id: int):
         from app.services.analysis.topics import analyze_product_topics
         from app.services.analysis.fake_detection import detect_fake_reviews
         from app.services.analysis.insights import generate_product_insights
+        from app.routers.analysis import invalidate_analysis_cache
         
         print(f"[ANALYSIS] Starting analysis for product {product_id}")
         
+        # Load the reviews once, with every column the stages below read
+        reviews = db.execute(
+            select(Review.id, Review.review_text, Review.rating, Review.verified_purchase)
+            .where(Review.product_id == product_id)
+        ).all()
+        
+        # Nothing changed since the last complete run: its results still stand
+        current_hash = reviews_hash(reviews)
+        last_run = db.scalar(
+            select(AnalysisCache.results)
+            .where(AnalysisCache.product_id == product_id, AnalysisCache.analysis_type == PIPELINE_CACHE_TYPE)
+            .order_by(AnalysisCache.id.desc())
+            .limit(1)
+        )
+        if last_run and last_run.get("reviews_hash") == current_hash:
+            print(f"[SKIP] Reviews unchanged since last analysis of product {product_id}")
+            return
+        
         # 1. Sentiment Analysis
         print("  > Running sentiment analysis...")
-        await analyze_product_sentiment(db, product_id)
+        await analyze_product_sentiment(db, product_id, reviews=reviews)
         
         # 2. Fake Review Detection (needs sentiment first)
         print("  > Detecting fake reviews...")
-        await detect_fake_reviews(db, product_id)
-        
-        # 3. Aspect-Based Sentiment
-        print("  > Analyzing aspects...")
-        await analyze_product_aspects(db, product_id)
+        await detect_fake_reviews(db, product_id, reviews=reviews)
         
-        # 4. Topic Modeling
-        print("  > Modeling topics...")
-        await analyze_product_topics(db, product_id)
+        # 3 & 4. Aspect-Based Sentiment and Topic Modeling (independent of
+        # each other, so topics run while aspect sentences are classified)
+        print("  > Analyzing aspects and modeling topics...")
+        await asyncio.gather(
+            analyze_product_aspects(db, product_id, reviews=reviews),
+            with_session(analyze_product_topics, product_id, reviews=reviews)
+        )
         
         # 5. Generate Insights (aggregates everything)
         print("  > Generating insights...")
         await generate_product_insights(db, product_id)
         
-        # Update product timestamp
-        product = db.query(Product).filter(Product.id == product_id).first()
-        if product:
-            product.last_analyzed = datetime.utcnow()
-            db.commit()
+        # Update product timestamp and remember which reviews were analyzed
+        db.execute(
+            update(Product).where(Product.id == product_id).values(last_analyzed=datetime.utcnow())
+        )
+        db.execute(
+            delete(AnalysisCache)
+            .where(AnalysisCache.product_id == product_id, AnalysisCache.analysis_type == PIPELINE_CACHE_TYPE)
+        )
+        db.add(AnalysisCache(
+            product_id=product_id,
+            analysis_type=PIPELINE_CACHE_TYPE,
+            results={"reviews_hash": current_hash}
+        ))
+        db.commit()
+        
+        # Drop cached API responses and analyses computed from the previous analysis
+        invalidate_product_cache(product_id)
+        invalidate_analysis_cache(product_id)
         
         print(f"[DONE] Analysis complete for product {product_id}")
         
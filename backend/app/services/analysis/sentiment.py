@@ -1,33 +1,181 @@
 """Sentiment analysis service using HuggingFace Transformers."""
 import asyncio
+import math
+import os
+import re
+from collections import Counter
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
-from app.models import Product, Review
+from app.models import Review
 from app.config import get_settings
+from app.services.analysis.sentiment_cache import SentimentCache
 
 settings = get_settings()
 
-# Lazy-loaded transformer pipeline
-_sentiment_pipeline = None
+# Texts are truncated by the tokenizer to this many tokens (roughly the 95th
+# percentile of review length); attention cost grows with its square
+MAX_SEQUENCE_LENGTH = 128
 
+# Padded sequence lengths for a compiled model, so only this many graphs get traced
+SEQUENCE_BUCKETS = (64, 96, MAX_SEQUENCE_LENGTH)
 
-def get_sentiment_pipeline():
-    """Get or create the sentiment analysis pipeline."""
-    global _sentiment_pipeline
+# Truncation and int8 weights change scores, so each variant gets its own cache entries
+sentiment_cache = SentimentCache(
+    os.path.join(settings.model_cache_dir, "sentiment.sqlite3"),
+    f"{settings.sentiment_model}|{MAX_SEQUENCE_LENGTH}" + ("@int8" if settings.sentiment_quantize else ""),
+    max_entries=settings.sentiment_cache_size
+)
+
+# Lexical prefilter: short texts whose polar words all agree, with nothing
+# negating or qualifying them, are labelled without the model
+POLAR_WORDS = {
+    "excellent": 3.0, "amazing": 3.0, "awesome": 3.0, "fantastic": 3.0,
+    "outstanding": 3.0, "superb": 3.0, "perfect": 3.0, "love": 3.0,
+    "loved": 3.0, "best": 3.0, "great": 2.5, "brilliant": 2.5,
+    "wonderful": 2.5, "good": 2.0, "nice": 2.0, "happy": 2.0,
+    "satisfied": 2.0, "recommended": 2.0,
+    "worst": -3.0, "terrible": -3.0, "horrible": -3.0, "awful": -3.0,
+    "useless": -3.0, "pathetic": -3.0, "waste": -3.0, "hate": -3.0,
+    "fraud": -3.0, "scam": -3.0, "bad": -2.5, "poor": -2.5,
+    "disappointed": -2.5, "disappointing": -2.5, "defective": -2.5,
+    "broken": -2.5,
+}
+HEDGE_WORDS = frozenset({
+    "not", "no", "never", "nor", "nothing", "without", "hardly", "barely",
+    "but", "however", "although", "though", "except", "yet", "otherwise",
+    "isn't", "wasn't", "aren't", "don't", "doesn't", "didn't", "can't",
+    "won't", "isnt", "wasnt", "dont", "doesnt", "didnt", "cant", "wont",
+})
+PREFILTER_MAX_WORDS = 40
+PREFILTER_THRESHOLD = 0.6
+WORD_RE = re.compile(r"[a-z']+")
+
+
+def _normalize_label(label: str) -> str:
+    """Map model labels (POSITIVE/NEGATIVE or LABEL_1/LABEL_0) to ours."""
+    label = label.lower()
+    if 'positive' in label or label == 'label_1':
+        return 'positive'
+    elif 'negative' in label or label == 'label_0':
+        return 'negative'
+    return 'neutral'
+
+
+def lexicon_polarity(text: str) -> Optional[Tuple[str, float]]:
+    """
+    (label, score) for short, unambiguous texts, or None to use the model.
+    
+    Polar word valences are summed and squashed into -1..1 as
+    sum / sqrt(sum^2 + 15); only results at or beyond PREFILTER_THRESHOLD
+    are trusted.
+    """
+    words = WORD_RE.findall(text.lower())
+    if len(words) > PREFILTER_MAX_WORDS:
+        return None
+    
+    total = 0.0
+    has_positive = has_negative = False
+    for word in words:
+        if word in HEDGE_WORDS:
+            return None
+        valence = POLAR_WORDS.get(word)
+        if valence is None:
+            continue
+        total += valence
+        if valence > 0:
+            has_positive = True
+        else:
+            has_negative = True
+    
+    if has_positive and has_negative:
+        return None
+    compound = total / math.sqrt(total * total + 15)
+    if abs(compound) < PREFILTER_THRESHOLD:
+        return None
+    return ('positive' if compound > 0 else 'negative'), round(abs(compound), 4)
+
+
+@lru_cache(maxsize=1)
+def get_sentiment_model():
+    """
+    Load the tokenizer and classifier once (lazily, on first use).
+    
+    With SENTIMENT_QUANTIZE set (the default) the Linear layers are
+    dynamically quantized to int8, which roughly halves CPU inference time;
+    if the CPU has no quantized engine the float model is kept.
     
-    if _sentiment_pipeline is None:
-        from transformers import pipeline
-        _sentiment_pipeline = pipeline(
-            "sentiment-analysis",
-            model=settings.sentiment_model,
-            device=-1  # CPU, use 0 for GPU
+    With SENTIMENT_COMPILE set the model is wrapped in torch.compile and
+    warmed up on every sequence bucket here, so requests never pay for
+    tracing; if compiling fails the eager model is used.
+    
+    Returns:
+        Tuple of (tokenizer, model, labels, compiled) where labels[i] is our
+        label for the model's class i
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    
+    # Intra-op threads on every core; no inter-op pool, batches run one at a time
+    torch.set_num_threads(os.cpu_count() or 1)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Only settable before the first parallel op
+    
+    tokenizer = AutoTokenizer.from_pretrained(settings.sentiment_model)
+    model = AutoModelForSequenceClassification.from_pretrained(settings.sentiment_model).eval()
+    labels = [_normalize_label(model.config.id2label[i]) for i in range(model.config.num_labels)]
+    
+    quantized = False
+    if settings.sentiment_quantize:
+        try:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            quantized = True
+        except Exception as e:
+            print(f"[WARN] int8 quantization failed, using float sentiment model: {e}")
+    
+    compiled = False
+    if settings.sentiment_compile:
+        try:
+            compiled_model = torch.compile(model, dynamic=False)
+            with torch.inference_mode():
+                for length in SEQUENCE_BUCKETS:
+                    compiled_model(**tokenizer(
+                        [""], padding="max_length", max_length=length, return_tensors="pt"
+                    ))
+            model, compiled = compiled_model, True
+        except Exception as e:
+            print(f"[WARN] torch.compile failed, using eager sentiment model: {e}")
+    
+    variant = ", ".join(name for name, on in (("int8", quantized), ("compiled", compiled)) if on)
+    print(f"[OK] Loaded sentiment model: {settings.sentiment_model}" + (f" ({variant})" if variant else ""))
+    
+    return tokenizer, model, labels, compiled
+
+
+def _encode(tokenizer, batch: List[str], compiled: bool):
+    """
+    Tokenize a batch, padded to its longest text, or for a compiled model
+    to the smallest sequence bucket that fits it.
+    """
+    if not compiled:
+        return tokenizer(
+            batch,
+            padding=True,
+            truncation=True,
+            max_length=MAX_SEQUENCE_LENGTH,
+            return_tensors="pt"
         )
-        print(f"[OK] Loaded sentiment model: {settings.sentiment_model}")
     
-    return _sentiment_pipeline
+    encoded = tokenizer(batch, truncation=True, max_length=MAX_SEQUENCE_LENGTH)
+    longest = max(len(ids) for ids in encoded["input_ids"])
+    bucket = next(length for length in SEQUENCE_BUCKETS if length >= longest)
+    return tokenizer.pad(encoded, padding="max_length", max_length=bucket, return_tensors="pt")
 
 
 def analyze_text(text: str) -> Tuple[str, float]:
@@ -40,76 +188,100 @@ def analyze_text(text: str) -> Tuple[str, float]:
     if not text or len(text.strip()) < 3:
         return "neutral", 0.5
     
-    # Truncate long texts (transformer limit)
-    text = text[:512]
-    
-    try:
-        pipeline = get_sentiment_pipeline()
-        result = pipeline(text)[0]
-        
-        label = result['label'].lower()
-        score = result['score']
-        
-        # Map LABEL_0/LABEL_1 or POSITIVE/NEGATIVE
-        if 'positive' in label or label == 'label_1':
-            return 'positive', score
-        elif 'negative' in label or label == 'label_0':
-            return 'negative', score
-        else:
-            return 'neutral', score
-    
-    except Exception as e:
-        print(f"Sentiment analysis error: {e}")
-        return "neutral", 0.5
+    return analyze_texts_batch([text])[0]
 
 
-def analyze_texts_batch(texts: List[str], batch_size: int = 32) -> List[Tuple[str, float]]:
+def analyze_texts_batch(texts: List[str], batch_size: int = 64) -> List[Tuple[str, float]]:
     """
     Analyze sentiment of multiple texts in batches.
     
+    Clear-cut short texts are labelled by the lexical prefilter (when
+    SENTIMENT_PREFILTER is on) and results already in the sentiment cache
+    are reused; only distinct, remaining texts go through the model.
+    
     Returns:
-        List of (label, score) tuples
+        List of (label, score) tuples, in input order
+    """
+    # Truncation happens in the tokenizer, by tokens
+    texts = [t or "" for t in texts]
+    keys = [sentiment_cache.make_key(t) for t in texts]
+    
+    known = {}
+    if settings.sentiment_prefilter:
+        for key, text in zip(keys, texts):
+            if key not in known and (result := lexicon_polarity(text)) is not None:
+                known[key] = result
+    known.update(sentiment_cache.get_many([key for key in keys if key not in known]))
+    
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in known:
+            pending.setdefault(key, text)
+    
+    if pending:
+        classified = _classify(list(pending.values()), batch_size)
+        fresh = {key: result for key, result in zip(pending, classified) if result is not None}
+        sentiment_cache.set_many(fresh)
+        known.update(fresh)
+    
+    # Failed batches come back neutral and are not cached
+    return [known.get(key, ('neutral', 0.5)) for key in keys]
+
+
+def _classify(texts: List[str], batch_size: int) -> List[Optional[Tuple[str, float]]]:
     """
-    results = []
-    pipeline = get_sentiment_pipeline()
+    Run the model over texts; None for texts in a batch that failed (all
+    None when the model can't be loaded).
+    
+    Texts are tokenized per batch and padded only to that batch's longest
+    text; batches are formed from length-sorted texts so padding stays small.
+    """
+    results: List[Optional[Tuple[str, float]]] = [None] * len(texts)
+    try:
+        import torch
+        tokenizer, model, labels, compiled = get_sentiment_model()
+    except Exception as e:
+        print(f"Sentiment model unavailable: {e}")
+        return results
+    
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
     
     # Process in batches
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        # Truncate and clean
-        batch = [t[:512] if t else "" for t in batch]
+    for start in range(0, len(order), batch_size):
+        indices = order[start:start + batch_size]
+        batch = [texts[i] for i in indices]
         
         try:
-            batch_results = pipeline(batch)
+            encoded = _encode(tokenizer, batch, compiled)
+            with torch.inference_mode():
+                probs = model(**encoded).logits.softmax(-1)
+            scores, classes = probs.max(-1)
             
-            for result in batch_results:
-                label = result['label'].lower()
-                score = result['score']
-                
-                if 'positive' in label or label == 'label_1':
-                    results.append(('positive', score))
-                elif 'negative' in label or label == 'label_0':
-                    results.append(('negative', score))
-                else:
-                    results.append(('neutral', score))
+            for i, cls, score in zip(indices, classes.tolist(), scores.tolist()):
+                results[i] = (labels[cls], score)
         
         except Exception as e:
             print(f"Batch analysis error: {e}")
-            # Fill with neutral for failed batch
-            results.extend([('neutral', 0.5)] * len(batch))
     
     return results
 
 
-async def analyze_product_sentiment(db: Session, product_id: int) -> Dict:
+async def analyze_product_sentiment(db: Session, product_id: int, reviews: Optional[Sequence] = None) -> Dict:
     """
     Analyze overall sentiment for a product.
     
+    Args:
+        reviews: The product's review rows (with id, review_text and
+            rating), if the caller already loaded them
+    
     Returns:
         Dictionary with sentiment analysis results
     """
-    # Get all reviews
-    reviews = db.query(Review).filter(Review.product_id == product_id).all()
+    # Get all reviews (just the columns used)
+    if reviews is None:
+        reviews = db.execute(
+            select(Review.id, Review.review_text, Review.rating).where(Review.product_id == product_id)
+        ).all()
     
     if not reviews:
         return {
@@ -132,31 +304,30 @@ async def analyze_product_sentiment(db: Session, product_id: int) -> Dict:
     sentiments = await asyncio.to_thread(analyze_texts_batch, texts)
     
     # Update reviews with sentiment
-    positive_count = 0
-    negative_count = 0
-    neutral_count = 0
-    mismatch_count = 0
-    total_score = 0
-    
-    for review, (label, score) in zip(reviews, sentiments):
-        review.sentiment_label = label
-        review.sentiment_score = score
-        review.analyzed_at = datetime.utcnow()
-        
-        if label == 'positive':
-            positive_count += 1
-            total_score += score
-        elif label == 'negative':
-            negative_count += 1
-            total_score -= score
-        else:
-            neutral_count += 1
-        
-        # Check for rating/sentiment mismatch
-        if (label == 'positive' and review.rating <= 2) or \
-           (label == 'negative' and review.rating >= 4):
-            mismatch_count += 1
+    analyzed_at = datetime.utcnow()
+    updates = [
+        {"id": r.id, "sentiment_label": label, "sentiment_score": score, "analyzed_at": analyzed_at}
+        for r, (label, score) in zip(reviews, sentiments)
+    ]
+    
+    # Distribution and net score (positive adds, negative subtracts)
+    label_counts = Counter(label for label, _ in sentiments)
+    positive_count = label_counts['positive']
+    negative_count = label_counts['negative']
+    neutral_count = len(sentiments) - positive_count - negative_count
+    total_score = sum(
+        score if label == 'positive' else -score
+        for label, score in sentiments
+        if label != 'neutral'
+    )
+    # Rating/sentiment mismatches: positive text with 1-2 stars, negative with 4-5
+    mismatch_count = sum(
+        1 for r, (label, _) in zip(reviews, sentiments)
+        if (label == 'positive' and r.rating <= 2) or (label == 'negative' and r.rating >= 4)
+    )
     
+    # One executemany UPDATE by primary key
+    db.execute(update(Review), updates)
     db.commit()
     
     # Calculate percentages
@@ -175,12 +346,6 @@ async def analyze_product_sentiment(db: Session, product_id: int) -> Dict:
     else:
         overall_label = "neutral"
     
-    # Update product
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if product:
-        product.last_analyzed = datetime.utcnow()
-        db.commit()
-    
     return {
         "product_id": product_id,
         "overall_score": round(overall_score, 2),
@@ -0,0 +1,81 @@
+"""Persistent sentiment results, keyed by a hash of model name and review text."""
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+# Keys per SELECT ... IN (...), well under SQLite's bound-parameter limit
+_LOOKUP_CHUNK = 500
+
+
+class SentimentCache:
+    """
+    (label, score) per text in a small SQLite file next to the model cache,
+    so re-analysis and re-scraped duplicates skip the transformer.
+
+    Holds at most ``max_entries`` rows; the oldest inserts are dropped first.
+    A ``max_entries`` of 0 disables the cache.
+    """
+
+    def __init__(self, path: str, model: str, max_entries: int = 200_000):
+        self.path = path
+        self.model = model
+        self.max_entries = max_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment "
+                "(key BLOB PRIMARY KEY, label TEXT NOT NULL, score REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def make_key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.model}|{text}".encode(), digest_size=16).digest()
+
+    def get_many(self, keys: Sequence[bytes]) -> Dict[bytes, Tuple[str, float]]:
+        """Cached results for whichever of the keys are present."""
+        if not self.max_entries or not keys:
+            return {}
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            conn = self._connection()
+            for i in range(0, len(unique), _LOOKUP_CHUNK):
+                chunk = unique[i:i + _LOOKUP_CHUNK]
+                rows = conn.execute(
+                    f"SELECT key, label, score FROM sentiment WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for key, label, score in rows:
+                    found[key] = (label, score)
+        return found
+
+    def set_many(self, results: Dict[bytes, Tuple[str, float]]):
+        """Store results and trim the table back to max_entries."""
+        if not self.max_entries or not results:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sentiment (key, label, score) VALUES (?, ?, ?)",
+                    [(key, label, score) for key, (label, score) in results.items()]
+                )
+                conn.execute(
+                    "DELETE FROM sentiment WHERE rowid <= "
+                    "(SELECT max(rowid) FROM sentiment) - ?",
+                    (self.max_entries,)
+                )
+
+    def clear(self):
+        with self._lock:
+            with self._connection() as conn:
+                conn.execute("DELETE FROM sentiment")
@@ -1,15 +1,18 @@
 """Topic modeling service using LDA."""
+import asyncio
 import re
 from datetime import datetime
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
 from collections import Counter
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models import Review, Topic
 
 # Common English stopwords
-STOPWORDS = set([
+STOPWORDS = frozenset([
     "i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you", "your",
     "yours", "yourself", "yourselves", "he", "him", "his", "himself", "she",
     "her", "hers", "herself", "it", "its", "itself", "they", "them", "their",
@@ -29,19 +32,19 @@ STOPWORDS = set([
 ])
 
 
+# Runs of three or more letters; anything else separates tokens
+TOKEN_RE = re.compile(r"[a-z]{3,}")
+
+
 def preprocess_text(text: str) -> List[str]:
     """Clean and tokenize text."""
-    # Lowercase and remove special characters
-    text = text.lower()
-    text = re.sub(r'[^a-z\s]', ' ', text)
-    
-    # Tokenize
-    words = text.split()
-    
-    # Remove stopwords and short words
-    words = [w for w in words if w not in STOPWORDS and len(w) > 2]
-    
-    return words
+    return list(_tokens(text))
+
+
+@lru_cache(maxsize=50_000)
+def _tokens(text: str) -> Tuple[str, ...]:
+    """Lowercased, stopword-free tokens of a text, memoized across analysis runs."""
+    return tuple(w for w in TOKEN_RE.findall(text.lower()) if w not in STOPWORDS)
 
 
 def simple_lda(documents: List[List[str]], num_topics: int = 5, num_words: int = 10) -> List[Dict]:
@@ -58,36 +61,33 @@ def simple_lda(documents: List[List[str]], num_topics: int = 5, num_words: int =
         doc_word_freq.append(doc_counter)
         word_freq.update(doc)
     
-    # Get top words
-    top_words = [word for word, _ in word_freq.most_common(100)]
-    
-    # Cluster documents based on which top words they contain most
-    # This is a simplified approach - real LDA would be better
-    
-    # Group by most frequent word in each doc
-    word_to_docs = {word: [] for word in top_words[:num_topics * 3]}
+    # Only the most frequent words can seed a topic
+    candidates = [word for word, _ in word_freq.most_common(num_topics * 3)]
+    candidate_set = set(candidates)
     
+    # Inverted index: candidate word -> documents containing it
+    word_to_docs = {word: [] for word in candidates}
     for i, doc_counter in enumerate(doc_word_freq):
-        for word in top_words[:num_topics * 3]:
-            if word in doc_counter:
-                word_to_docs[word].append(i)
+        for word in candidate_set.intersection(doc_counter):
+            word_to_docs[word].append(i)
     
     # Select top topic words based on document coverage
     topic_words = []
     used_words = set()
     
-    for word in top_words:
+    for word in candidates:
         if word not in used_words and len(topic_words) < num_topics:
-            # Find related words (co-occurring)
-            related = []
-            docs_with_word = word_to_docs.get(word, [])
+            # Find related words (co-occurring): sum the counts of the
+            # documents containing the word, then drop excluded words
+            docs_with_word = word_to_docs[word]
             
             if len(docs_with_word) >= 3:  # Minimum documents
                 co_occur = Counter()
                 for doc_idx in docs_with_word:
-                    for w in documents[doc_idx]:
-                        if w != word and w not in used_words:
-                            co_occur[w] += 1
+                    co_occur.update(doc_word_freq[doc_idx])
+                del co_occur[word]
+                for w in used_words:
+                    del co_occur[w]
                 
                 related = [w for w, _ in co_occur.most_common(num_words - 1)]
                 used_words.add(word)
@@ -101,6 +101,12 @@ def simple_lda(documents: List[List[str]], num_topics: int = 5, num_words: int =
     return topic_words
 
 
+def _review_documents(reviews) -> List[List[str]]:
+    """Tokens of each review with at least 3 of them; shorter ones are dropped."""
+    documents = [preprocess_text(r.review_text) for r in reviews]
+    return [d for d in documents if len(d) >= 3]
+
+
 def generate_topic_label(keywords: List[str]) -> str:
     """Generate a human-readable label for a topic."""
     # Map common keywords to labels
@@ -135,14 +141,26 @@ def generate_topic_label(keywords: List[str]) -> str:
     return keywords[0].capitalize() + " Related"
 
 
-async def analyze_product_topics(db: Session, product_id: int, num_topics: int = 5) -> Dict:
+async def analyze_product_topics(
+    db: Session,
+    product_id: int,
+    num_topics: int = 5,
+    reviews: Optional[Sequence] = None
+) -> Dict:
     """
     Perform topic modeling on product reviews.
     
+    Args:
+        reviews: The product's review rows (with review_text), if the
+            caller already loaded them
+    
     Returns:
         Dictionary with discovered topics
     """
-    reviews = db.query(Review).filter(Review.product_id == product_id).all()
+    if reviews is None:
+        reviews = db.execute(
+            select(Review.review_text).where(Review.product_id == product_id)
+        ).all()
     
     if not reviews:
         return {
@@ -151,9 +169,8 @@ async def analyze_product_topics(db: Session, product_id: int, num_topics: int =
             "analyzed_at": datetime.utcnow().isoformat()
         }
     
-    # Preprocess all reviews
-    documents = [preprocess_text(r.review_text) for r in reviews]
-    documents = [d for d in documents if len(d) >= 3]  # Filter short docs
+    # Tokenizing and modeling are pure CPU work: keep them off the event loop
+    documents = await asyncio.to_thread(_review_documents, reviews)
     
     if len(documents) < 10:
         return {
@@ -162,11 +179,22 @@ async def analyze_product_topics(db: Session, product_id: int, num_topics: int =
             "analyzed_at": datetime.utcnow().isoformat()
         }
     
-    # Clear existing topics
+    # Run topic modeling
+    topic_results = await asyncio.to_thread(simple_lda, documents, num_topics)
+    
+    # Clear existing topics (after modeling, so the write transaction stays short)
     db.query(Topic).filter(Topic.product_id == product_id).delete()
     
-    # Run topic modeling
-    topic_results = simple_lda(documents, num_topics=num_topics)
+    # Sample reviews: the first 3 of the first 50 reviews mentioning each
+    # topic's primary keyword, found in one pass over the lowercased texts
+    primary_keywords = {topic["keywords"][0] for topic in topic_results}
+    samples_by_keyword = {keyword: [] for keyword in primary_keywords}
+    for review in reviews[:50]:
+        lowered = review.review_text.lower()
+        for keyword in primary_keywords:
+            samples = samples_by_keyword[keyword]
+            if len(samples) < 3 and keyword in lowered:
+                samples.append(review.review_text[:150] + "...")
     
     # Build response and save to DB
     topics = []
@@ -184,21 +212,12 @@ async def analyze_product_topics(db: Session, product_id: int, num_topics: int =
         )
         db.add(topic_record)
         
-        # Get sample reviews for this topic
-        sample_reviews = []
-        primary_keyword = keywords[0]
-        for review in reviews[:50]:  # Check first 50
-            if primary_keyword in review.review_text.lower():
-                sample_reviews.append(review.review_text[:150] + "...")
-                if len(sample_reviews) >= 3:
-                    break
-        
         topics.append({
             "topic_number": i + 1,
             "topic_label": label,
             "keywords": keywords,
             "review_count": topic["doc_count"],
-            "sample_reviews": sample_reviews
+            "sample_reviews": samples_by_keyword[keywords[0]]
         })
     
     db.commit()
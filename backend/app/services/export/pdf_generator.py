@@ -1,7 +1,7 @@
 """PDF report generator using ReportLab."""
 import io
 from datetime import datetime
-from typing import Dict, Any
+from typing import Any, BinaryIO, Dict, Optional
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
@@ -16,47 +16,89 @@ from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.charts.barcharts import VerticalBarChart
 
 
-def generate_analysis_pdf(product, insights: Dict[str, Any]) -> io.BytesIO:
+# Styles are built once and shared by every report
+_styles = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_styles['Title'],
+    fontSize=20,
+    spaceAfter=20,
+    textColor=colors.HexColor('#1a1a2e')
+)
+
+HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=_styles['Heading2'],
+    fontSize=14,
+    spaceBefore=15,
+    spaceAfter=10,
+    textColor=colors.HexColor('#16213e')
+)
+
+BODY_STYLE = ParagraphStyle(
+    'CustomBody',
+    parent=_styles['Normal'],
+    fontSize=10,
+    spaceAfter=8
+)
+
+FOOTER_STYLE = ParagraphStyle('Footer', parent=_styles['Normal'], fontSize=8, textColor=colors.grey)
+
+OVERVIEW_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.white),
+])
+
+RATING_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a1a2e')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cccccc')),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f8f8')]),
+])
+
+SENTIMENT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#16213e')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor('#d4edda')),
+    ('BACKGROUND', (0, 2), (-1, 2), colors.HexColor('#fff3cd')),
+    ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor('#f8d7da')),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cccccc')),
+])
+
+
+def generate_analysis_pdf(product, insights: Dict[str, Any], output: Optional[BinaryIO] = None) -> BinaryIO:
     """
     Generate a PDF report for product analysis.
     
     Args:
         product: Product model instance
         insights: Insights dictionary from generate_product_insights
+        output: Seekable binary file to write the PDF into (a new BytesIO
+            if omitted)
     
     Returns:
-        BytesIO buffer containing PDF
+        The output file, rewound to the start of the PDF
     """
-    buffer = io.BytesIO()
+    buffer = output if output is not None else io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
     
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Title'],
-        fontSize=20,
-        spaceAfter=20,
-        textColor=colors.HexColor('#1a1a2e')
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceBefore=15,
-        spaceAfter=10,
-        textColor=colors.HexColor('#16213e')
-    )
-    
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=8
-    )
-    
     elements = []
     
     # Title
@@ -64,13 +106,13 @@ def generate_analysis_pdf(product, insights: Dict[str, Any]) -> io.BytesIO:
     if len(product_name) > 60:
         product_name = product_name[:57] + "..."
     
-    elements.append(Paragraph(f"{product_name}", title_style))
-    elements.append(Paragraph(f"Analysis Report - {datetime.now().strftime('%B %d, %Y')}", body_style))
+    elements.append(Paragraph(f"{product_name}", TITLE_STYLE))
+    elements.append(Paragraph(f"Analysis Report - {datetime.now().strftime('%B %d, %Y')}", BODY_STYLE))
     elements.append(HRFlowable(width="100%", thickness=2, color=colors.HexColor('#e94560')))
     elements.append(Spacer(1, 20))
     
     # Overview Section
-    elements.append(Paragraph("Overview", heading_style))
+    elements.append(Paragraph("Overview", HEADING_STYLE))
     
     overview_data = [
         ["Overall Score", f"{insights['overall_score']:.1f} / 100"],
@@ -80,47 +122,26 @@ def generate_analysis_pdf(product, insights: Dict[str, Any]) -> io.BytesIO:
     ]
     
     overview_table = Table(overview_data, colWidths=[2.5*inch, 2*inch])
-    overview_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.white),
-    ]))
+    overview_table.setStyle(OVERVIEW_TABLE_STYLE)
     elements.append(overview_table)
     elements.append(Spacer(1, 15))
     
     # Rating Distribution
-    elements.append(Paragraph("Rating Distribution", heading_style))
+    elements.append(Paragraph("Rating Distribution", HEADING_STYLE))
     
     rating_dist = insights['rating_distribution']
+    rating_pct = insights['rating_percentages']
     rating_data = [["Rating", "Count", "Percentage"]]
-    total = insights['total_reviews']
     for stars in range(5, 0, -1):
-        count = rating_dist.get(stars, 0)
-        pct = (count / total * 100) if total > 0 else 0
-        rating_data.append([f"{stars} Stars", str(count), f"{pct:.1f}%"])
+        rating_data.append([f"{stars} Stars", str(rating_dist.get(stars, 0)), f"{rating_pct.get(stars, 0):.1f}%"])
     
     rating_table = Table(rating_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch])
-    rating_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a1a2e')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cccccc')),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f8f8')]),
-    ]))
+    rating_table.setStyle(RATING_TABLE_STYLE)
     elements.append(rating_table)
     elements.append(Spacer(1, 15))
     
     # Sentiment Distribution
-    elements.append(Paragraph("Sentiment Analysis", heading_style))
+    elements.append(Paragraph("Sentiment Analysis", HEADING_STYLE))
     
     sent_dist = insights['sentiment_distribution']
     sentiment_data = [
@@ -131,59 +152,47 @@ def generate_analysis_pdf(product, insights: Dict[str, Any]) -> io.BytesIO:
     ]
     
     sent_table = Table(sentiment_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch])
-    sent_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#16213e')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('BACKGROUND', (0, 1), (-1, 1), colors.HexColor('#d4edda')),
-        ('BACKGROUND', (0, 2), (-1, 2), colors.HexColor('#fff3cd')),
-        ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor('#f8d7da')),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#cccccc')),
-    ]))
+    sent_table.setStyle(SENTIMENT_TABLE_STYLE)
     elements.append(sent_table)
     elements.append(Spacer(1, 15))
     
     # Common Keywords
-    elements.append(Paragraph("Key Findings", heading_style))
+    elements.append(Paragraph("Key Findings", HEADING_STYLE))
     
     praises = insights.get('common_praises', [])[:5]
     complaints = insights.get('common_complaints', [])[:5]
     
     if praises:
-        elements.append(Paragraph(f"<b>Common Praises:</b> {', '.join(praises)}", body_style))
+        elements.append(Paragraph(f"<b>Common Praises:</b> {', '.join(praises)}", BODY_STYLE))
     if complaints:
-        elements.append(Paragraph(f"<b>Common Complaints:</b> {', '.join(complaints)}", body_style))
+        elements.append(Paragraph(f"<b>Common Complaints:</b> {', '.join(complaints)}", BODY_STYLE))
     
     elements.append(Spacer(1, 15))
     
     # Top Reviews
     if insights.get('top_positive_reviews'):
-        elements.append(Paragraph("Top Positive Reviews", heading_style))
+        elements.append(Paragraph("Top Positive Reviews", HEADING_STYLE))
         for i, review in enumerate(insights['top_positive_reviews'][:3], 1):
             text = review['text'].replace('\n', ' ')
             if len(text) > 200:
                 text = text[:197] + "..."
-            elements.append(Paragraph(f"{i}. Rating {review['rating']}/5 - \"{text}\"", body_style))
+            elements.append(Paragraph(f"{i}. Rating {review['rating']}/5 - \"{text}\"", BODY_STYLE))
     
     if insights.get('top_negative_reviews'):
         elements.append(Spacer(1, 10))
-        elements.append(Paragraph("Top Negative Reviews", heading_style))
+        elements.append(Paragraph("Top Negative Reviews", HEADING_STYLE))
         for i, review in enumerate(insights['top_negative_reviews'][:3], 1):
             text = review['text'].replace('\n', ' ')
             if len(text) > 200:
                 text = text[:197] + "..."
-            elements.append(Paragraph(f"{i}. Rating {review['rating']}/5 - \"{text}\"", body_style))
+            elements.append(Paragraph(f"{i}. Rating {review['rating']}/5 - \"{text}\"", BODY_STYLE))
     
     # Footer
     elements.append(Spacer(1, 30))
     elements.append(HRFlowable(width="100%", thickness=1, color=colors.grey))
     elements.append(Paragraph(
         f"<i>Generated by E-commerce Review Analyzer on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</i>",
-        ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, textColor=colors.grey)
+        FOOTER_STYLE
     ))
     
     # Build PDF
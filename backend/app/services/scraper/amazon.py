@@ -3,67 +3,171 @@ import asyncio
 import random
 import re
 import time
-from datetime import datetime
-from typing import Callable, Dict, List, Optional
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Tuple
 from dateutil import parser as date_parser
 
-import requests
-from bs4 import BeautifulSoup
+import httpx
+from lxml import etree, html
 from app.config import get_settings
 
+# ASIN locations in product URLs, most specific first
+_ASIN_PATTERNS = (
+    re.compile(r'/dp/([A-Z0-9]{10})'),
+    re.compile(r'/product/([A-Z0-9]{10})'),
+    re.compile(r'/gp/product/([A-Z0-9]{10})'),
+)
+# Any 10-character string that looks like an ASIN
+_ASIN_FALLBACK = re.compile(r'([B0][A-Z0-9]{9})')
+_RATING_RE = re.compile(r'(\d+(?:\.\d+)?)')
+_DATE_RE = re.compile(r'on (.+)$')
+# "January 15, 2024" (amazon.com) and "15 January 2024" (amazon.in)
+_MONTH_NAMES = r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*'
+_DATE_MDY_RE = re.compile(_MONTH_NAMES + r'\.?\s+(\d{1,2}),?\s+(\d{4})')
+_DATE_DMY_RE = re.compile(r'(\d{1,2})\s+' + _MONTH_NAMES + r'\.?,?\s+(\d{4})')
+_MONTHS = {m: i for i, m in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1
+)}
+_NUM_RE = re.compile(r'(\d+)')
+
+# Page-level queries
+_CAPTCHA_XP = etree.XPath('//input[@id="captchacharacters"]')
+# Soft-block pages answer 200 with one of these messages
+_SOFT_BLOCK_XP = etree.XPath(
+    'boolean(//text()[contains(., "Something went wrong") or contains(., "Serve Protection")])'
+)
+_PRODUCT_LINK_XP = etree.XPath('//a[@data-hook="product-link"]')
+_TITLE_XP = etree.XPath('//title')
+_REVIEW_DIVS_XP = etree.XPath('//div[@data-hook="review"]')
+_ALT_REVIEW_DIVS_XP = etree.XPath('//div[@class="a-section review aok-relative"]')
+
+# Queries relative to one review div: every data-hook element, and the reviewer name
+_HOOKED_XP = etree.XPath('.//*[@data-hook]')
+_PROFILE_XP = etree.XPath('.//span[contains(concat(" ", normalize-space(@class), " "), " a-profile-name ")]')
+
+# Review pages fetched at once, and roughly how many reviews each one holds
+PAGE_CONCURRENCY = 3
+REVIEWS_PER_PAGE = 10
+
+# Wait after a block, doubled for each further block in a row
+BLOCK_BACKOFF_SECONDS = 10
+
+# User agents rotated per request
+_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+)
+
+# Browser headers sent with every request (the User-Agent is rotated per request)
+BASE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Cache-Control': 'max-age=0',
+}
+
+# One client per process, shared by every scrape, so connections stay warm
+# from one product to the next
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared HTTP/2 client for Amazon requests."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            headers=BASE_HEADERS,
+            timeout=15,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=PAGE_CONCURRENCY, keepalive_expiry=60)
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared client, on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _parse_response(response: httpx.Response) -> html.HtmlElement:
+    """
+    Parse a streamed response with lxml as its chunks arrive, so the page
+    is never buffered whole; an empty body parses as an empty document.
+    """
+    parser = html.HTMLParser(encoding=response.charset_encoding)
+    async for chunk in response.aiter_bytes():
+        parser.feed(chunk)
+    try:
+        return parser.close()
+    except etree.XMLSyntaxError:
+        return html.document_fromstring(b"<html></html>")
+
+
+def _match_date(text: str) -> Optional[date]:
+    """Date from Amazon's fixed review-date formats, or None if neither matches."""
+    try:
+        match = _DATE_MDY_RE.search(text)
+        if match:
+            return date(int(match.group(3)), _MONTHS[match.group(1)], int(match.group(2)))
+        match = _DATE_DMY_RE.search(text)
+        if match:
+            return date(int(match.group(3)), _MONTHS[match.group(2)], int(match.group(1)))
+    except ValueError:
+        pass
+    return None
+
+
+def _first(xpath: etree.XPath, element) -> Optional[html.HtmlElement]:
+    """First match of a precompiled XPath, or None."""
+    matches = xpath(element)
+    return matches[0] if matches else None
+
+
+def _text(element, strip: bool = False) -> str:
+    """Text of an element and its descendants (each piece stripped if strip)."""
+    if strip:
+        return "".join(t.strip() for t in element.itertext())
+    return "".join(element.itertext())
+
 
 class AmazonScraper:
     """Scraper for Amazon product reviews."""
     
     def __init__(self):
-        self.session = requests.Session()
         self.product_name: Optional[str] = None
-        
-        # List of potential user agents to rotate
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        ]
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The process-wide client (see get_client)."""
+        return get_client()
 
     def _get_headers(self) -> Dict[str, str]:
-        """Get request headers to mimic a real browser."""
-        ua = random.choice(self.user_agents)
-        return {
-            'User-Agent': ua,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0',
-        }
+        """Per-request headers: a rotated User-Agent (the client sends the rest)."""
+        return {'User-Agent': random.choice(_USER_AGENTS)}
     
     def _build_reviews_url(self, product_url: str, page: int = 1) -> str:
         """Build the reviews page URL."""
         # Extract ASIN
-        # Try multiple patterns for ASIN
-        asin_patterns = [
-            r'/dp/([A-Z0-9]{10})',
-            r'/product/([A-Z0-9]{10})',
-            r'/gp/product/([A-Z0-9]{10})'
-        ]
-        
         asin = None
-        for pattern in asin_patterns:
-            match = re.search(pattern, product_url)
+        for pattern in _ASIN_PATTERNS:
+            match = pattern.search(product_url)
             if match:
                 asin = match.group(1)
                 break
         
         if not asin:
             # Fallback: try to find any 10 char string that looks like an ASIN
-            match = re.search(r'([B0][A-Z0-9]{9})', product_url)
+            match = _ASIN_FALLBACK.search(product_url)
             if match:
                 asin = match.group(1)
             else:
@@ -80,7 +184,7 @@ class AmazonScraper:
     def _build_fallback_url(self, product_url: str) -> str:
         """Build a fallback URL (main product page) if reviews are blocked."""
         # Extract ASIN
-        match = re.search(r'([B0][A-Z0-9]{9})', product_url)
+        match = _ASIN_FALLBACK.search(product_url)
         if match:
             asin = match.group(1)
             if ".in" in product_url:
@@ -89,67 +193,73 @@ class AmazonScraper:
                 return f"https://www.amazon.com/dp/{asin}"
         return product_url
     
-    def _parse_review(self, review_div: BeautifulSoup) -> Optional[Dict]:
-        """Parse a single review div."""
+    def _parse_review(self, review_div: html.HtmlElement, today: Optional[date] = None) -> Optional[Dict]:
+        """Parse a single review div; undated reviews get ``today`` (default: now)."""
         try:
             # Get review text
-            body = review_div.find('span', {'data-hook': 'review-body'})
-            if not body:
+            # One pass over the div's data-hook elements; the first of each (tag, hook) wins
+            hooks = {}
+            for element in _HOOKED_XP(review_div):
+                hooks.setdefault((element.tag, element.get('data-hook')), element)
+            
+            body = hooks.get(('span', 'review-body'))
+            if body is None:
                 return None
-            text = body.get_text(strip=True)
+            text = _text(body, strip=True)
             
             if not text or len(text) < 5:
                 # Try to get title as text if body is empty
-                title = review_div.find('a', {'data-hook': 'review-title'})
-                if title:
-                    text = title.get_text(strip=True)
+                title = hooks.get(('a', 'review-title'))
+                if title is not None:
+                    text = _text(title, strip=True)
                 else:
                     return None
             
             # Get rating
-            rating_elem = review_div.find('i', {'data-hook': 'review-star-rating'})
-            if not rating_elem:
-                rating_elem = review_div.find('i', {'data-hook': 'cmps-review-star-rating'})
+            rating_elem = hooks.get(('i', 'review-star-rating'))
+            if rating_elem is None:
+                rating_elem = hooks.get(('i', 'cmps-review-star-rating'))
             
             rating = 3  # default
-            if rating_elem:
-                rating_text = rating_elem.get_text()
+            if rating_elem is not None:
+                rating_text = _text(rating_elem)
                 # "4.0 out of 5 stars" -> 4
-                rating_match = re.search(r'(\d+(\.\d+)?)', rating_text)
+                rating_match = _RATING_RE.search(rating_text)
                 if rating_match:
                     val = float(rating_match.group(1))
                     rating = int(round(val))
             
             # Get date
-            date_elem = review_div.find('span', {'data-hook': 'review-date'})
+            date_elem = hooks.get(('span', 'review-date'))
             review_date = None
-            if date_elem:
-                date_text = date_elem.get_text()
+            if date_elem is not None:
+                date_text = _text(date_elem)
                 # Extract date from "Reviewed in India on January 15, 2024"
-                date_match = re.search(r'on (.+)$', date_text)
+                review_date = _match_date(date_text)
+                date_match = None if review_date else _DATE_RE.search(date_text)
                 if date_match:
+                    # Some other format: let dateutil have a go
                     try:
                         review_date = date_parser.parse(date_match.group(1)).date()
                     except:
                         pass
             
             if not review_date:
-                review_date = datetime.now().date()
+                review_date = today or datetime.now().date()
             
             # Get reviewer name
-            profile = review_div.find('span', class_='a-profile-name')
-            reviewer_name = profile.get_text(strip=True) if profile else "Amazon Customer"
+            profile = _first(_PROFILE_XP, review_div)
+            reviewer_name = _text(profile, strip=True) if profile is not None else "Amazon Customer"
             
             # Check verified purchase
-            verified_elem = review_div.find('span', {'data-hook': 'avp-badge'})
-            verified = verified_elem is not None
+            verified = ('span', 'avp-badge') in hooks
             
             # Get helpful count
-            helpful_elem = review_div.find('span', {'data-hook': 'helpful-vote-statement'})
+            helpful_elem = hooks.get(('span', 'helpful-vote-statement'))
             helpful_count = 0
-            if helpful_elem:
-                helpful_text = helpful_elem.get_text()
-                helpful_match = re.search(r'(\d+)', helpful_text)
+            if helpful_elem is not None:
+                helpful_text = _text(helpful_elem)
+                helpful_match = _NUM_RE.search(helpful_text)
                 if helpful_match:
                     helpful_count = int(helpful_match.group(1))
                 elif "One person" in helpful_text:
@@ -168,6 +278,31 @@ class AmazonScraper:
             print(f"Error parsing review: {e}")
             return None
     
+    async def warm_up(self, product_url: str):
+        """
+        Open the connection to the product's site (DNS, TCP, TLS) with a
+        HEAD request, so a page fetch started meanwhile reuses it instead
+        of connecting after its polite delay. Failures are ignored.
+        """
+        try:
+            await self.client.head(product_url, headers=self._get_headers())
+        except httpx.HTTPError as e:
+            print(f"Warm-up request failed: {e}")
+    
+    async def _fetch_page(
+        self, url: str, slots: asyncio.Semaphore
+    ) -> Tuple[int, Optional[html.HtmlElement]]:
+        """
+        GET a page after a random polite delay, holding one of the page
+        slots. Returns the status code and, for a 200, the parsed page.
+        """
+        async with slots:
+            await asyncio.sleep(random.uniform(2, 5))
+            async with self.client.stream("GET", url, headers=self._get_headers()) as response:
+                if response.status_code != 200:
+                    return response.status_code, None
+                return response.status_code, await _parse_response(response)
+    
     async def scrape_reviews(
         self,
         product_url: str,
@@ -176,130 +311,147 @@ class AmazonScraper:
     ) -> List[Dict]:
         """
         Scrape reviews from Amazon product page.
+        
+        Up to PAGE_CONCURRENCY pages are fetched at once (only as many as
+        the remaining reviews need) and then parsed in page order.
         """
         reviews = []
+        seen_texts = set()
         page = 1
         consecutive_empty = 0
         consecutive_errors = 0
+        slots = asyncio.Semaphore(PAGE_CONCURRENCY)
         
         print(f"Starting scrape for: {product_url}")
         
         while len(reviews) < max_reviews and consecutive_empty < 3 and consecutive_errors < 5:
             try:
-                url = self._build_reviews_url(product_url, page)
-                
-                # Make request with random delay
-                delay = random.uniform(2, 5) # Reasonable delay
-                print(f"Scraping page {page} (delay {delay:.1f}s)...")
-                await asyncio.sleep(delay)
-                
-                response = await asyncio.to_thread(
-                    self.session.get,
-                    url,
-                    headers=self._get_headers(),
-                    timeout=15
-                )
-                
-                if response.status_code != 200:
-                    print(f"Got status {response.status_code} on page {page}")
-                    consecutive_errors += 1
+                pages_needed = -(-(max_reviews - len(reviews)) // REVIEWS_PER_PAGE)
+                pages = list(range(page, page + min(PAGE_CONCURRENCY, pages_needed)))
+                urls = [self._build_reviews_url(product_url, p) for p in pages]
+            except Exception as e:
+                print(f"Request error on page {page}: {e}")
+                consecutive_errors += 1
+                await asyncio.sleep(5)
+                continue
+            
+            print(f"Scraping pages {pages[0]}-{pages[-1]}...")
+            responses = await asyncio.gather(
+                *(self._fetch_page(url, slots) for url in urls),
+                return_exceptions=True
+            )
+            
+            # Next batch starts after this one, unless a page below asks for a retry
+            page = pages[-1] + 1
+            stop = False
+            for current, url, response in zip(pages, urls, responses):
+                if len(reviews) >= max_reviews:
+                    break
+                try:
+                    if isinstance(response, Exception):
+                        raise response
+                    status, tree = response
                     
-                    # If blocked, wait longer and try again
-                    if response.status_code in [503, 403, 429]:
-                        print("Blocked! Waiting 10 seconds...")
-                        await asyncio.sleep(10)
-                        # Rotate session
-                        self.session = requests.Session()
+                    if status != 200:
+                        print(f"Got status {status} on page {current}")
+                        consecutive_errors += 1
+                        
+                        # If blocked, wait longer and try again
+                        if status in [503, 403, 429]:
+                            backoff = BLOCK_BACKOFF_SECONDS * 2 ** (consecutive_errors - 1)
+                            print(f"Blocked! Waiting {backoff} seconds...")
+                            await asyncio.sleep(backoff)
+                            # Throttled: start over as a new visitor
+                            if status in [503, 429]:
+                                self.client.cookies.clear()
+                            page = current
+                            break
+                        
                         continue
                     
-                    page += 1
-                    continue
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Check for captcha
-                if soup.find('input', id='captchacharacters'):
-                    print("CAPTCHA detected! Stopping scrape to avoid ban.")
-                    break
-                
-                # Check for "Something went wrong"
-                if "Something went wrong" in soup.get_text() or "Serve Protection" in soup.get_text():
-                    print("Blocked! (Something went wrong / Serve Protection)")
-                    consecutive_errors += 1
-                    await asyncio.sleep(10)
-                    self.session = requests.Session()
-                    continue
-
-                # Get product name on first page
-                if page == 1 and not self.product_name:
-                    title = soup.find('a', {'data-hook': 'product-link'})
-                    if title:
-                        self.product_name = title.get_text(strip=True)
-                    else:
-                        # Fallback title
-                        title_tag = soup.find('title')
-                        if title_tag:
-                            self.product_name = title_tag.get_text(strip=True).replace("Amazon.in:Customer reviews: ", "").replace("Amazon.com:Customer reviews: ", "")
-                
-                # Find review divs
-                review_divs = soup.find_all('div', {'data-hook': 'review'})
-                
-                if not review_divs:
-                    # Check if we hit a different layout
-                    alt_divs = soup.find_all('div', class_='a-section review aok-relative')
-                    if alt_divs:
-                        review_divs = alt_divs
-
-                if not review_divs:
-                    print(f"No reviews found on page {page}")
+                    # Check for captcha
+                    if _CAPTCHA_XP(tree):
+                        print("CAPTCHA detected! Stopping scrape to avoid ban.")
+                        stop = True
+                        break
                     
-                    # Try fallback if first page fails
-                    if page == 1 and consecutive_errors == 0:
-                        print("Trying fallback URL...")
-                        fallback_url = self._build_fallback_url(product_url)
-                        if fallback_url != url:
-                            print(f"Scraping fallback: {fallback_url}")
-                            try:
-                                await asyncio.sleep(random.uniform(2, 5))
-                                response = await asyncio.to_thread(self.session.get, fallback_url, headers=self._get_headers(), timeout=15)
-                                if response.status_code == 200:
-                                    soup_fb = BeautifulSoup(response.content, 'html.parser')
-                                    review_divs = soup_fb.find_all('div', {'data-hook': 'review'})
-                                    print(f"Fallback found {len(review_divs)} reviews")
-                                    if review_divs:
-                                        url = fallback_url  # Update current URL context
-                                        soup = soup_fb      # Update soup
-                            except Exception as e:
-                                print(f"Fallback failed: {e}")
-
-                    if not review_divs:
-                        consecutive_empty += 1
-                        page += 1
-                        continue
-                
-                print(f"Found {len(review_divs)} reviews on page {page}")
-                consecutive_empty = 0
-                consecutive_errors = 0
-                
-                for div in review_divs:
-                    if len(reviews) >= max_reviews:
+                    # Check for "Something went wrong"
+                    if _SOFT_BLOCK_XP(tree):
+                        print("Blocked! (Something went wrong / Serve Protection)")
+                        consecutive_errors += 1
+                        await asyncio.sleep(BLOCK_BACKOFF_SECONDS * 2 ** (consecutive_errors - 1))
+                        page = current
                         break
                     
-                    review = self._parse_review(div)
-                    if review:
-                        # Avoid duplicates
-                        if not any(r['text'] == review['text'] for r in reviews):
-                            reviews.append(review)
+                    # Get product name on first page
+                    if current == 1 and not self.product_name:
+                        title = _first(_PRODUCT_LINK_XP, tree)
+                        if title is not None:
+                            self.product_name = _text(title, strip=True)
+                        else:
+                            # Fallback title
+                            title_tag = _first(_TITLE_XP, tree)
+                            if title_tag is not None:
+                                self.product_name = _text(title_tag, strip=True).replace("Amazon.in:Customer reviews: ", "").replace("Amazon.com:Customer reviews: ", "")
+                    
+                    # Find review divs
+                    review_divs = _REVIEW_DIVS_XP(tree)
+                    
+                    if not review_divs:
+                        # Check if we hit a different layout
+                        alt_divs = _ALT_REVIEW_DIVS_XP(tree)
+                        if alt_divs:
+                            review_divs = alt_divs
+                    
+                    if not review_divs:
+                        print(f"No reviews found on page {current}")
                         
-                        if progress_callback:
-                            progress_callback(len(reviews), max_reviews)
-                
-                page += 1
+                        # Try fallback if first page fails
+                        if current == 1 and consecutive_errors == 0:
+                            print("Trying fallback URL...")
+                            fallback_url = self._build_fallback_url(product_url)
+                            if fallback_url != url:
+                                print(f"Scraping fallback: {fallback_url}")
+                                try:
+                                    status, fallback_tree = await self._fetch_page(fallback_url, slots)
+                                    if status == 200:
+                                        review_divs = _REVIEW_DIVS_XP(fallback_tree)
+                                        print(f"Fallback found {len(review_divs)} reviews")
+                                except Exception as e:
+                                    print(f"Fallback failed: {e}")
+                        
+                        if not review_divs:
+                            consecutive_empty += 1
+                            continue
+                    
+                    print(f"Found {len(review_divs)} reviews on page {current}")
+                    consecutive_empty = 0
+                    consecutive_errors = 0
+                    
+                    today = datetime.now().date()
+                    for div in review_divs:
+                        if len(reviews) >= max_reviews:
+                            break
+                        
+                        review = self._parse_review(div, today)
+                        if review:
+                            # Avoid duplicates
+                            if review['text'] not in seen_texts:
+                                seen_texts.add(review['text'])
+                                reviews.append(review)
+                            
+                            if progress_callback:
+                                progress_callback(len(reviews), max_reviews)
                 
-            except Exception as e:
-                print(f"Request error on page {page}: {e}")
-                consecutive_errors += 1
-                await asyncio.sleep(5)
+                except Exception as e:
+                    print(f"Request error on page {current}: {e}")
+                    consecutive_errors += 1
+                    await asyncio.sleep(5)
+                    page = current
+                    break
+            
+            if stop:
+                break
         
         print(f"Scraping finished. Total reviews: {len(reviews)}")
         return reviews
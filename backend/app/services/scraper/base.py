@@ -5,19 +5,49 @@ from datetime import datetime
 from typing import Callable, Optional, Tuple
 from urllib.parse import urlparse
 
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
 from app.database import SessionLocal
+from app.middleware import invalidate_product_cache
 from app.models import Product, Review
 
 
+# Supported hosts, matched on the URL's hostname (and its subdomains) only
+PLATFORMS = {
+    "amazon.in": "amazon",
+    "amazon.com": "amazon",
+    "flipkart.com": "flipkart",
+}
+
+
 def detect_platform(url: str) -> str:
-    """Detect e-commerce platform from URL."""
-    domain = urlparse(url).netloc.lower()
-    if "amazon" in domain:
-        return "amazon"
-    elif "flipkart" in domain:
-        return "flipkart"
-    else:
-        raise ValueError(f"Unsupported platform: {domain}")
+    """Detect e-commerce platform from the URL's hostname."""
+    host = urlparse(url).hostname or ""
+    # www.amazon.in -> amazon.in, dl.flipkart.com -> flipkart.com
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        platform = PLATFORMS.get(".".join(parts[i:]))
+        if platform:
+            return platform
+    raise ValueError(f"Unsupported platform: {host or url}. Only Amazon and Flipkart are supported.")
+
+
+def update_product_stats(db: Session, product_id: int):
+    """
+    Recompute a product's total_reviews and avg_rating from its stored reviews
+    in one UPDATE, whichever path inserted them. Does not commit.
+    """
+    of_product = Review.product_id == product_id
+    db.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(
+            total_reviews=select(func.count(Review.id)).where(of_product).scalar_subquery(),
+            avg_rating=select(func.round(func.avg(Review.rating), 1)).where(of_product).scalar_subquery()
+        )
+        .execution_options(synchronize_session=False)
+    )
 
 
 def clean_product_url(url: str, platform: str) -> str:
@@ -97,30 +127,29 @@ async def scrape_product(
         # Update product info
         if reviews_data:
             product.name = scraper.product_name
-            product.total_reviews = len(reviews_data)
             product.scraped_at = datetime.utcnow()
-            
-            # Calculate average rating
-            ratings = [r['rating'] for r in reviews_data if r.get('rating')]
-            if ratings:
-                product.avg_rating = sum(ratings) / len(ratings)
         
-        # Delete old reviews and add new ones
-        db.query(Review).filter(Review.product_id == product.id).delete()
+        # Delete old reviews and add new ones (one executemany INSERT)
+        db.execute(delete(Review).where(Review.product_id == product.id))
         
-        for review_data in reviews_data:
-            review = Review(
-                product_id=product.id,
-                review_text=review_data.get('text', ''),
-                rating=review_data.get('rating', 3),
-                review_date=review_data.get('date'),
-                reviewer_name=review_data.get('reviewer_name'),
-                verified_purchase=review_data.get('verified', False),
-                helpful_count=review_data.get('helpful_count', 0)
-            )
-            db.add(review)
+        if reviews_data:
+            db.execute(insert(Review), [
+                {
+                    "product_id": product.id,
+                    "review_text": review_data.get('text', ''),
+                    "rating": review_data.get('rating', 3),
+                    "review_date": review_data.get('date'),
+                    "reviewer_name": review_data.get('reviewer_name'),
+                    "verified_purchase": review_data.get('verified', False),
+                    "helpful_count": review_data.get('helpful_count', 0)
+                }
+                for review_data in reviews_data
+            ])
         
+        db.flush()
+        update_product_stats(db, product.id)
         db.commit()
+        invalidate_product_cache(product.id)
         
         # Run initial analysis
         from app.services.analysis import run_complete_analysis
@@ -2,46 +2,97 @@
 import asyncio
 import random
 import re
-from datetime import datetime
+from datetime import date, datetime
 from typing import Callable, Dict, List, Optional
-from dateutil import parser as date_parser
 
-import requests
+import httpx
 from bs4 import BeautifulSoup
+from cachetools import TTLCache
 
 from app.config import get_settings
 
+# Resolved product URLs per search URL; failed lookups are not cached
+_search_cache = TTLCache(maxsize=64, ttl=600)
+
+_PAGE_RE = re.compile(r'[?&]page=\d+')
+# Review dates look like "Jan, 2024" or "12 March, 2024"
+_DATE_RE = re.compile(r'\b(?:(\d{1,2})\s+)?(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s*,\s*(\d{4})\b')
+_MONTHS = {m: i for i, m in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1
+)}
+# Page title suffixes: "<name> Reviews: ..." and "<name> | Flipkart.com"
+_TITLE_CLEAN_1 = re.compile(r'\s*Reviews:.*')
+_TITLE_CLEAN_2 = re.compile(r'\s*\|.*')
+
+# Review card classes, newest layout first; Flipkart renames them now and then
+REVIEW_CARD_SELECTORS = ('div.col.EPCmJX', 'div._27M-vq', 'div.col._2wzgFH')
+RATING_STRINGS = frozenset("12345")
+
+# Review pages fetched at once, and roughly how many reviews each one holds
+PAGE_CONCURRENCY = 3
+REVIEWS_PER_PAGE = 10
+
+# User agents rotated per request
+_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+)
+
+# Browser headers sent with every request (the User-Agent is rotated per request)
+BASE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Cache-Control': 'max-age=0',
+}
+
+# One client per process, shared by every scrape, so connections stay warm
+# from one product to the next
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared HTTP/2 client for Flipkart requests."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=True,
+            headers=BASE_HEADERS,
+            timeout=20,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=PAGE_CONCURRENCY, keepalive_expiry=60)
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared client, on shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 
 class FlipkartScraper:
     """Scraper for Flipkart product reviews."""
     
     def __init__(self):
-        self.session = requests.Session()
         self.product_name: Optional[str] = None
-        
-        self.user_agents = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
-        ]
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The process-wide client (see get_client)."""
+        return get_client()
 
     def _get_headers(self) -> Dict[str, str]:
-        """Get request headers to mimic a real browser."""
-        ua = random.choice(self.user_agents)
-        return {
-            'User-Agent': ua,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0',
-        }
+        """Per-request headers: a rotated User-Agent (the client sends the rest)."""
+        return {'User-Agent': random.choice(_USER_AGENTS)}
 
     def _convert_to_review_url(self, product_url: str) -> str:
         """
@@ -57,15 +108,16 @@ class FlipkartScraper:
     def _build_reviews_url(self, product_url: str, page: int = 1) -> str:
         """Build the reviews page URL with pagination."""
         base = self._convert_to_review_url(product_url)
-        base = re.sub(r'[?&]page=\d+', '', base)
+        base = _PAGE_RE.sub('', base)
         if '?' in base:
             return f"{base}&marketplace=FLIPKART&page={page}"
         else:
             return f"{base}?marketplace=FLIPKART&page={page}"
 
-    def _parse_review_from_strings(self, strings: List[str]) -> Optional[Dict]:
+    def _parse_review_from_strings(self, strings: List[str], today: Optional[date] = None) -> Optional[Dict]:
         """
-        Parse a review from stripped_strings of a review container.
+        Parse a review from stripped_strings of a review container. Dates
+        after ``today`` (default: now) are ignored.
         
         Pattern:
         [0] rating, [1] title, [2] text, [3] READ MORE,
@@ -103,7 +155,9 @@ class FlipkartScraper:
             
             # Metadata
             reviewer_name = "Flipkart Customer"
-            review_date = datetime.now().date()
+            if today is None:
+                today = datetime.now().date()
+            review_date = today
             verified = False
             helpful_count = 0
             
@@ -115,16 +169,15 @@ class FlipkartScraper:
                         if name != "READ MORE" and not name.isdigit() and len(name) < 40:
                             reviewer_name = name
                 
-                # Date like "Jan, 2024"
-                if "," in s and len(s) < 20 and any(m in s for m in [
-                    "Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                    "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
-                ]):
+                # Date like "Jan, 2024" (taken as the 1st of the month)
+                date_match = _DATE_RE.search(s) if len(s) < 20 else None
+                if date_match:
+                    day, month, year = date_match.groups()
                     try:
-                        d = date_parser.parse(s, fuzzy=True).date()
-                        if d <= datetime.now().date():
+                        d = date(int(year), _MONTHS[month], int(day or 1))
+                        if d <= today:
                             review_date = d
-                    except (ValueError, OverflowError):
+                    except ValueError:
                         pass
                 
                 if s == "Permalink" and i >= 2:
@@ -147,38 +200,55 @@ class FlipkartScraper:
 
     def _extract_reviews_from_soup(self, soup: BeautifulSoup) -> List[Dict]:
         """Extract all reviews from a parsed page."""
-        reviews = []
-        cbs = soup.find_all(string=lambda t: t and "Certified Buyer" in t)
+        review_strings = self._review_card_strings(soup) or self._find_review_strings(soup)
         
-        review_containers = []
-        for cb in cbs:
-            p = cb.parent
-            for _ in range(15):
-                if p is None:
-                    break
-                p = p.parent
-                if p and p.name == 'div':
-                    inner_cbs = len(p.find_all(string=lambda t: t and "Certified Buyer" in t))
-                    if inner_cbs != 1:
-                        continue
-                    strings = list(p.stripped_strings)
-                    # The full review container has: rating + title + text + READ MORE + metadata
-                    # It should have 10+ strings and contain review text (READ MORE or rating digit)
-                    has_review_text = any("READ MORE" in s for s in strings)
-                    has_rating = len(strings) > 0 and strings[0] in ["1", "2", "3", "4", "5"]
-                    if (has_review_text or has_rating) and len(strings) >= 8:
-                        if p not in review_containers:
-                            review_containers.append(p)
-                        break
-        
-        for container in review_containers:
-            strings = list(container.stripped_strings)
-            review = self._parse_review_from_strings(strings)
+        reviews = []
+        today = datetime.now().date()
+        for strings in review_strings:
+            review = self._parse_review_from_strings(strings, today)
             if review:
                 reviews.append(review)
         
         return reviews
 
+    def _review_card_strings(self, soup: BeautifulSoup) -> List[List[str]]:
+        """stripped_strings of each review card, found by its known CSS class."""
+        for selector in REVIEW_CARD_SELECTORS:
+            cards = [list(card.stripped_strings) for card in soup.select(selector)]
+            # A card starts with its star rating; anything else is a stale class name
+            cards = [strings for strings in cards if strings and strings[0] in RATING_STRINGS]
+            if cards:
+                return cards
+        return []
+
+    def _find_review_strings(self, soup: BeautifulSoup) -> List[List[str]]:
+        """
+        Fallback when no card class matches: climb from each "Certified
+        Buyer" label to the smallest div that holds a whole review.
+        """
+        cbs = soup.find_all(string=lambda t: t and "Certified Buyer" in t)
+        
+        seen_containers = set()
+        review_strings = []
+        for cb in cbs:
+            for p in cb.parent.find_parents('div', limit=15):
+                strings = list(p.stripped_strings)
+                # The full review container has: rating + title + text + READ MORE + metadata
+                # It should have 10+ strings and contain review text (READ MORE or rating digit)
+                has_review_text = any("READ MORE" in s for s in strings)
+                has_rating = len(strings) > 0 and strings[0] in RATING_STRINGS
+                if not ((has_review_text or has_rating) and len(strings) >= 8):
+                    continue
+                # ...and exactly one review's "Certified Buyer" label
+                if sum("Certified Buyer" in s for s in strings) != 1:
+                    continue
+                if id(p) not in seen_containers:
+                    seen_containers.add(id(p))
+                    review_strings.append(strings)
+                break
+        
+        return review_strings
+
     def _extract_product_name(self, soup: BeautifulSoup) -> Optional[str]:
         """Extract product name from the page."""
         for selector in ['span.B_NuCI', 'h1.yhB1nd']:
@@ -189,24 +259,37 @@ class FlipkartScraper:
         title = soup.find('title')
         if title:
             text = title.get_text(strip=True)
-            text = re.sub(r'\s*Reviews:.*', '', text)
-            text = re.sub(r'\s*\|.*', '', text)
+            text = _TITLE_CLEAN_1.sub('', text)
+            text = _TITLE_CLEAN_2.sub('', text)
             if text and len(text) > 5:
                 return text
         return None
 
+    async def _fetch_page(self, url: str, slots: asyncio.Semaphore) -> httpx.Response:
+        """GET a page after a random polite delay, holding one of the page slots."""
+        async with slots:
+            await asyncio.sleep(random.uniform(2.0, 4.0))
+            return await self.client.get(url, headers=self._get_headers())
+
     async def scrape_reviews(
         self,
         product_url: str,
         max_reviews: int = 50,
         progress_callback: Optional[Callable[[int, int], None]] = None
     ) -> List[Dict]:
-        """Scrape reviews from Flipkart product page."""
+        """
+        Scrape reviews from Flipkart product page.
+
+        Up to PAGE_CONCURRENCY pages are fetched at once (only as many as
+        the remaining reviews need) and then parsed in page order.
+        """
         reviews = []
+        seen_texts = set()
         page = 1
         consecutive_empty = 0
         consecutive_errors = 0
         max_pages = 25
+        slots = asyncio.Semaphore(PAGE_CONCURRENCY)
         
         print(f"Starting Flipkart scrape for: {product_url}")
         
@@ -223,8 +306,7 @@ class FlipkartScraper:
         # Initial visit to product page to set cookies/session
         try:
             print(f"Visiting product page to initialize session: {product_url}")
-            self.session.headers.update(self._get_headers())
-            await asyncio.to_thread(self.session.get, product_url, timeout=20)
+            await self.client.get(product_url, headers=self._get_headers())
             await asyncio.sleep(random.uniform(1.0, 2.0))
         except Exception as e:
             print(f"Error visiting product page: {e}")
@@ -234,70 +316,83 @@ class FlipkartScraper:
                 print(f"Reached max page limit ({max_pages}). Stopping.")
                 break
             
-            try:
-                url = self._build_reviews_url(product_url, page)
-                delay = random.uniform(2.0, 4.0)
-                print(f"  Page {page} (delay {delay:.1f}s)...")
-                await asyncio.sleep(delay)
-                
-                response = await asyncio.to_thread(
-                    self.session.get, url, headers=self._get_headers(), timeout=20
-                )
-                
-                if response.status_code != 200:
-                    print(f"  Got status {response.status_code} on page {page}")
+            pages_needed = -(-(max_reviews - len(reviews)) // REVIEWS_PER_PAGE)
+            pages = list(range(page, min(page + min(PAGE_CONCURRENCY, pages_needed), max_pages + 1)))
+            print(f"  Pages {pages[0]}-{pages[-1]}...")
+            responses = await asyncio.gather(
+                *(self._fetch_page(self._build_reviews_url(product_url, p), slots) for p in pages),
+                return_exceptions=True
+            )
+            
+            # Next batch starts after this one, unless a page below asks for a retry
+            page = pages[-1] + 1
+            for current, response in zip(pages, responses):
+                if len(reviews) >= max_reviews:
+                    break
+                try:
+                    if isinstance(response, Exception):
+                        raise response
+                    
+                    if response.status_code != 200:
+                        print(f"  Got status {response.status_code} on page {current}")
+                        consecutive_errors += 1
+                        continue
+                    
+                    soup = BeautifulSoup(response.content, 'lxml')
+                    
+                    if current == 1 and not self.product_name:
+                        self.product_name = self._extract_product_name(soup)
+                        if self.product_name:
+                            print(f"  Product: {self.product_name}")
+                    
+                    page_reviews = self._extract_reviews_from_soup(soup)
+                    
+                    if not page_reviews:
+                        print(f"  No reviews found on page {current}")
+                        consecutive_empty += 1
+                        continue
+                    
+                    added = 0
+                    for review in page_reviews:
+                        if len(reviews) >= max_reviews:
+                            break
+                        if review['text'] not in seen_texts:
+                            seen_texts.add(review['text'])
+                            reviews.append(review)
+                            added += 1
+                    
+                    print(f"  Added {added} reviews from page {current}. Total: {len(reviews)}")
+                    consecutive_empty = 0
+                    consecutive_errors = 0
+                    
+                    if progress_callback:
+                        progress_callback(len(reviews), max_reviews)
+                    
+                except Exception as e:
+                    print(f"  Error on page {current}: {e}")
                     consecutive_errors += 1
-                    page += 1
-                    continue
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                if page == 1 and not self.product_name:
-                    self.product_name = self._extract_product_name(soup)
-                    if self.product_name:
-                        print(f"  Product: {self.product_name}")
-                
-                page_reviews = self._extract_reviews_from_soup(soup)
-                
-                if not page_reviews:
-                    print(f"  No reviews found on page {page}")
-                    consecutive_empty += 1
-                    page += 1
-                    continue
-                
-                added = 0
-                for review in page_reviews:
-                    if len(reviews) >= max_reviews:
-                        break
-                    if not any(r['text'] == review['text'] for r in reviews):
-                        reviews.append(review)
-                        added += 1
-                
-                print(f"  Added {added} reviews from page {page}. Total: {len(reviews)}")
-                consecutive_empty = 0
-                consecutive_errors = 0
-                
-                if progress_callback:
-                    progress_callback(len(reviews), max_reviews)
-                
-                page += 1
-                
-            except Exception as e:
-                print(f"  Error on page {page}: {e}")
-                consecutive_errors += 1
-                await asyncio.sleep(5)
+                    await asyncio.sleep(5)
+                    page = current
+                    break
         
         print(f"Scraping finished. Total reviews: {len(reviews)}")
         return reviews
 
     async def find_product_url_from_search(self, search_url: str) -> Optional[str]:
-        """Find the first product URL from a Flipkart search page."""
+        """Find the first product URL from a Flipkart search page (cached for 10 minutes)."""
+        if search_url in _search_cache:
+            return _search_cache[search_url]
+        product_url = await self._search_product_url(search_url)
+        if product_url:
+            _search_cache[search_url] = product_url
+        return product_url
+
+    async def _search_product_url(self, search_url: str) -> Optional[str]:
+        """Fetch a Flipkart search page and return its first product link."""
         print(f"Searching: {search_url}")
         try:
-            response = await asyncio.to_thread(
-                self.session.get, search_url, headers=self._get_headers(), timeout=15
-            )
-            soup = BeautifulSoup(response.content, 'html.parser')
+            response = await self.client.get(search_url, headers=self._get_headers(), timeout=15)
+            soup = BeautifulSoup(response.content, 'lxml')
             
             all_links = soup.find_all('a', href=True)
             for a in all_links:
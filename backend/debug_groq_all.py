@@ -0,0 +1,61 @@
+"""Probe the Groq API with several models at once, on one event loop."""
+import asyncio
+from typing import Dict, Optional
+
+from app.config import get_settings
+from app.services.ai.groq_service import GroqService, close_client
+from seed_oneplus import NEGATIVE_REVIEWS, NEUTRAL_REVIEWS, POSITIVE_REVIEWS
+
+# None probes the configured GROQ_MODEL
+MODELS = [None, "llama3-8b-8192", "llama3-70b-8192", "mixtral-8x7b-32768"]
+SAMPLE_REVIEWS = [{'text': 'Great phone!', 'rating': 5}]
+# Every review text seed_oneplus.py draws from, for the batched summary
+SEED_REVIEWS = (
+    [{'text': text, 'rating': 5} for text in POSITIVE_REVIEWS]
+    + [{'text': text, 'rating': 2} for text in NEGATIVE_REVIEWS]
+    + [{'text': text, 'rating': 3} for text in NEUTRAL_REVIEWS]
+)
+
+
+async def probe(model: Optional[str] = None) -> Dict:
+    """Request one review summary from the given model."""
+    service = GroqService()
+    if model:
+        service.model = model
+    return await service.generate_review_summary(SAMPLE_REVIEWS, 'Test Product')
+
+
+async def probe_batch() -> Dict:
+    """Summarize all the seed reviews, 16 per prompt, with the configured model."""
+    return await GroqService().generate_batch_summary(SEED_REVIEWS, 'OnePlus 13R')
+
+
+async def closing(coro):
+    """Await a probe, then close the Groq client the probes share."""
+    try:
+        return await coro
+    finally:
+        await close_client()
+
+
+async def main():
+    settings = get_settings()
+    print(f"Groq API Key loaded: {'Yes' if settings.groq_api_key else 'No'}")
+    if settings.groq_api_key:
+        # censored key for safety
+        print(f"Key start: {settings.groq_api_key[:4]}...")
+    
+    models = [model or settings.groq_model for model in MODELS]
+    print(f"Testing models: {', '.join(models)}")
+    results = await asyncio.gather(*(probe(model) for model in models), return_exceptions=True)
+    for model, res in zip(models, results):
+        if isinstance(res, Exception):
+            print(f"[{model}] Error: {res}")
+        else:
+            print(f"[{model}] Result: {res}")
+    
+    print(f"Batch summary of {len(SEED_REVIEWS)} seed reviews: {await probe_batch()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(closing(main()))
@@ -1,80 +1,97 @@
 
-import requests
-from bs4 import BeautifulSoup
-import random
+import asyncio
+import html
+import re
+
+import httpx
+from lxml import etree
 
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
     'Accept-Language': 'en-US,en;q=0.9',
-    'Accept-Encoding': 'gzip, deflate, br',
-    'Connection': 'keep-alive',
     'Upgrade-Insecure-Requests': '1',
 }
 
-session = requests.Session()
-session.headers.update(headers)
-
 product_url = "https://www.flipkart.com/devsignature-sheesham-wood-dining-table-set-wooden-4-seater-set-home-solid/p/itme4fad1c7e12cc"
-review_url = "https://www.flipkart.com/devsignature-sheesham-wood-dining-table-set-wooden-4-seater-set-home-solid/product-reviews/itme4fad1c7e12cc?marketplace=FLIPKART&page=1"
-
-print(f"Visiting Product Page: {product_url}...")
-try:
-    p_response = session.get(product_url, timeout=20)
-    print(f"Product Page Status: {p_response.status_code}")
-    
-    print(f"Fetching Review Page: {review_url}...")
-    response = session.get(review_url, timeout=20)
-    print(f"Status Code: {response.status_code}")
-    
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
-    # Check Title
-    title = soup.find('title')
-    print(f"Title: {title.get_text(strip=True) if title else 'No Title'}")
-    
-    # Check Certified Buyer strings
-    cbs = soup.find_all(string=lambda t: t and "Certified Buyer" in t)
-    print(f"Found {len(cbs)} 'Certified Buyer' strings")
-    
-    if cbs:
-        print("\n--- Analysing First Match ---")
-        cb = cbs[0]
-        print(f"Text: {cb}")
-        parent = cb.parent
-        print(f"Parent Tag: {parent.name}")
-        print(f"Parent Class: {parent.get('class')}")
-        
-        # Traverse up and print simplified structure
-        p = parent
-        for i in range(5):
-            p = p.parent
-            if not p: break
-            print(f"Level {i+1} Up: {p.name} (Class: {p.get('class')})")
-            # print(f"  Text preview: {list(p.stripped_strings)[:5]}")
-
-    # Try existing extraction logic
-    print("\n--- Testing Extraction Logic ---")
-    review_containers = []
-    for cb in cbs:
-        p = cb.parent
-        for _ in range(15):
-            if p is None: break
-            p = p.parent
-            if p and p.name == 'div':
-                inner_cbs = len(p.find_all(string=lambda t: t and "Certified Buyer" in t))
-                # Relaxed check: Just see if we can find relevant text
-                strings = list(p.stripped_strings)
-                if any("READ MORE" in s for s in strings) and len(strings) >= 5:
-                     # Just checking if this simplified logic works
-                     if p not in review_containers:
-                        review_containers.append(p)
-                     break
-    
-    print(f"Found {len(review_containers)} potential containers with relaxed logic")
-    
-    if review_containers:
-        print("First container strings:", list(review_containers[0].stripped_strings))
-
-except Exception as e:
-    print(f"Error: {e}")
+review_base_url = "https://www.flipkart.com/devsignature-sheesham-wood-dining-table-set-wooden-4-seater-set-home-solid/product-reviews/itme4fad1c7e12cc?marketplace=FLIPKART&page="
+# Review pages fetched at once, multiplexed over one HTTP/2 connection
+PAGES = 3
+
+# The <title> probe runs on the raw bytes; no tree is needed for it
+TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+# Elements with a "Certified Buyer" text node of their own, compiled once
+CB_XPATH = etree.XPath('//*[text()[contains(., "Certified Buyer")]]')
+# Relaxed check: the nearest div up from each Certified Buyer line that also
+# has READ MORE and a few strings, in document order without repeats
+CONTAINER_XPATH = etree.XPath(
+    '//*[text()[contains(., "Certified Buyer")]]'
+    '/ancestor::div[.//text()[contains(., "READ MORE")] and count(.//text()[normalize-space()]) >= 5][1]'
+)
+
+
+def stripped_strings(el):
+    """Non-blank text under an element, stripped (BeautifulSoup's stripped_strings)."""
+    return [t.strip() for t in el.itertext() if t.strip()]
+
+
+async def main():
+    async with httpx.AsyncClient(
+        http2=True,
+        headers=headers,
+        timeout=20,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+    ) as client:
+        print(f"Visiting Product Page: {product_url}...")
+        try:
+            p_response = await client.get(product_url)
+            print(f"Product Page Status: {p_response.status_code} ({p_response.http_version})")
+            
+            review_urls = [f"{review_base_url}{page}" for page in range(1, PAGES + 1)]
+            print(f"Fetching {len(review_urls)} Review Pages...")
+            responses = await asyncio.gather(*(client.get(url) for url in review_urls))
+            for url, r in zip(review_urls, responses):
+                print(f"Status Code: {r.status_code} for {url}")
+            response = responses[0]
+            
+            # Check Title
+            m = TITLE_RE.search(response.content)
+            title = html.unescape(m.group(1).decode('utf-8', 'ignore')).strip() if m else None
+            print(f"Title: {title or 'No Title'}")
+
+            # Check Certified Buyer strings, parsing the page only if it has any
+            tree = etree.HTML(response.content) if b"Certified Buyer" in response.content else None
+            cb_elems = CB_XPATH(tree) if tree is not None else []
+            print(f"Found {len(cb_elems)} 'Certified Buyer' strings")
+
+            if cb_elems:
+                print("\n--- Analysing First Match ---")
+                parent = cb_elems[0]
+                print(f"Text: {next(t for t in parent.xpath('text()') if 'Certified Buyer' in t)}")
+                print(f"Parent Tag: {parent.tag}")
+                print(f"Parent Class: {parent.get('class')}")
+
+                # Traverse up and print simplified structure
+                p = parent
+                for i in range(5):
+                    p = p.getparent()
+                    if p is None: break
+                    print(f"Level {i+1} Up: {p.tag} (Class: {p.get('class')})")
+                    # print(f"  Text preview: {stripped_strings(p)[:5]}")
+
+            # Try existing extraction logic
+            print("\n--- Testing Extraction Logic ---")
+            review_containers = CONTAINER_XPATH(tree) if cb_elems else []
+
+            print(f"Found {len(review_containers)} potential containers with relaxed logic")
+
+            if review_containers:
+                print("First container strings:", stripped_strings(review_containers[0]))
+
+        except Exception as e:
+            print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,15 +1,15 @@
 import sys
 import os
 import random
-import uuid
 from datetime import datetime, timedelta
 
 # Add backend directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import SessionLocal, init_db
+from sqlalchemy import insert, true
+
+from app.database import SessionLocal
 from app.models import Product, Review
-from app.services.analysis.runner import run_complete_analysis
 import asyncio
 
 # Product Details
@@ -17,7 +17,7 @@ PRODUCT_NAME = "OnePlus 13R (Charcoal, 8GB RAM, 128GB Storage)"
 PRODUCT_URL = "https://www.amazon.in/OnePlus-Charcoal-Snapdragon-Personalised-Game-Changing/dp/B0FZSXYV6K"
 
 # Realistic Reviews for OnePlus 13R
-POSITIVE_REVIEWS = [
+POSITIVE_REVIEWS = (
     "The Snapdragon 8 Gen 2 processor is a beast! Gaming is buttery smooth, getting constant 120fps on BGMI. Battery life is also amazing.",
     "Classic OnePlus experience. OxygenOS is clean and fast. The 120Hz display looks stunning specifically for media consumption.",
     "Best phone under 40k due to the performance. Camera is decent, but the main highlight is the raw speed and charging. 0 to 100 in 30 mins!",
@@ -28,9 +28,9 @@ POSITIVE_REVIEWS = [
     "Highly recommended for gamers! The touch sampling rate is high and there's no lag. Heat management is better than 11R.",
     "Value for money product. You get flagship specs at a mid-range price. Call quality and network reception are also solid.",
     "Love the fast charging. I forgot to charge at night, plugged it in while showering and it was 85% done!"
-]
+)
 
-NEGATIVE_REVIEWS = [
+NEGATIVE_REVIEWS = (
     "Camera is average at best. Low light photos have too much noise. Expected better from Sony IMX sensor.",
     "Front camera washes out skin tones. It applies automatically beauty mode which I hate.",
     "Curved display causes accidentally touches. Flat screen would have been better for gaming.",
@@ -38,15 +38,15 @@ NEGATIVE_REVIEWS = [
     "No wireless charging support. At this price point, it should have been included.",
     "Heating up slightly while charging with the 100W brick. Got scared and turned it off.",
     "Ultrawide camera is useless, only 8MP details are soft. Only main camera is good."
-]
+)
 
-NEUTRAL_REVIEWS = [
+NEUTRAL_REVIEWS = (
     "It's a good phone but not a huge upgrade from 11R. Buy it only if you have an older device.",
     "Decent performance but battery drains faster on 5G. Needs software optimization.",
     "Good phone but the design is getting boring. Same circular camera module for 3 years now.",
     "Okay for daily use. Camera could be better. Fast charging is the only saving grace.",
     "Missing the IP68 rating. Only getting fake promises on water resistance."
-]
+)
 
 async def seed_oneplus():
     print(f"Creating simulation for: {PRODUCT_NAME}")
@@ -54,12 +54,15 @@ async def seed_oneplus():
     db = SessionLocal()
     
     try:
-        # Check if product exists and delete it
+        # Everything below is one transaction, committed once at the end
+        
+        # Check if product exists and delete it (flushed first, so the new
+        # product's INSERT doesn't collide with its URL)
         existing_product = db.query(Product).filter(Product.url == PRODUCT_URL).first()
         if existing_product:
             print(f"Found existing product {existing_product.id}, deleting...")
             db.delete(existing_product)
-            db.commit()
+            db.flush()
             print("Deleted existing product.")
 
         # Create Product
@@ -72,52 +75,46 @@ async def seed_oneplus():
             scraped_at=datetime.utcnow()
         )
         db.add(product)
-        db.commit()
-        db.refresh(product)
+        db.flush()
         product_id = product.id
         print(f"Product created with ID: {product_id}")
         
         # Generate Reviews
         reviews_data = []
         
-        # Add 35 Positive
-        for i in range(35):
-            reviews_data.append({
-                "text": random.choice(POSITIVE_REVIEWS),
-                "rating": random.choice([4, 5, 5]),
-                "name": f"OnePlus User {i}"
-            })
-            
-        # Add 10 Negative
-        for i in range(10):
-            reviews_data.append({
-                "text": random.choice(NEGATIVE_REVIEWS),
-                "rating": random.choice([1, 2, 2]),
-                "name": f"Disappointed Customer {i}"
-            })
-            
-        # Add 5 Neutral
-        for i in range(5):
-            reviews_data.append({
-                "text": random.choice(NEUTRAL_REVIEWS),
-                "rating": 3,
-                "name": f"Verified Buyer {i}"
-            })
+        # (count, texts, ratings drawn from, reviewer name) per sentiment
+        groups = [
+            (35, POSITIVE_REVIEWS, [4, 5, 5], "OnePlus User"),
+            (10, NEGATIVE_REVIEWS, [1, 2, 2], "Disappointed Customer"),
+            (5, NEUTRAL_REVIEWS, [3], "Verified Buyer"),
+        ]
+        for count, texts, ratings, name in groups:
+            reviews_data.extend(
+                {"text": text, "rating": rating, "name": f"{name} {i}"}
+                for i, (text, rating) in enumerate(zip(
+                    random.choices(texts, k=count), random.choices(ratings, k=count)
+                ))
+            )
             
         random.shuffle(reviews_data)
         
-        # Insert Reviews
-        for review_data in reviews_data:
-            review = Review(
-                product_id=product_id,
-                review_text=review_data["text"],
-                rating=review_data["rating"],
-                review_date=(datetime.now() - timedelta(days=random.randint(1, 60))).date(),
-                reviewer_name=review_data["name"],
-                verified_purchase=True,
-                helpful_count=random.randint(0, 20)
-            )
-            db.add(review)
+        # Insert Reviews (one executemany INSERT), dated within the last 60 days;
+        # every seeded buyer is verified, so that is written into the statement
+        n = len(reviews_data)
+        today = datetime.now().date()
+        days_ago = random.choices(range(1, 61), k=n)
+        helpful_counts = random.choices(range(0, 21), k=n)
+        db.execute(insert(Review).values(verified_purchase=true()), [
+            {
+                "product_id": product_id,
+                "review_text": review_data["text"],
+                "rating": review_data["rating"],
+                "review_date": today - timedelta(days=days),
+                "reviewer_name": review_data["name"],
+                "helpful_count": helpful
+            }
+            for review_data, days, helpful in zip(reviews_data, days_ago, helpful_counts)
+        ])
             
         db.commit()
         print(f"Inserted {len(reviews_data)} reviews")
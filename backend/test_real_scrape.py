@@ -1,12 +1,15 @@
 import asyncio
-from app.services.scraper.amazon import AmazonScraper
+from app.services.scraper.amazon import AmazonScraper, close_client
 
 async def test():
     scraper = AmazonScraper()
     url = "https://www.amazon.in/OnePlus-Charcoal-Snapdragon-Personalised-Game-Changing/dp/B0FZSXYV6K"
+    # Connect while the first page waits out its polite delay
+    warm_up = asyncio.create_task(scraper.warm_up(url))
     print(f"Testing scraper with URL: {url}")
     
     reviews = await scraper.scrape_reviews(url, max_reviews=10)
+    await warm_up
     
     print(f"\nScraped {len(reviews)} reviews")
     if reviews:
@@ -15,6 +18,8 @@ async def test():
         print(reviews[0])
     else:
         print("Failed to scrape any reviews.")
+    
+    await close_client()
 
 if __name__ == "__main__":
     asyncio.run(test())
@@ -0,0 +1,53 @@
+"""Tests for the product response cache middleware."""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import ResponseCacheMiddleware, invalidate_product_cache
+
+calls = {"count": 0}
+
+app = FastAPI()
+app.add_middleware(ResponseCacheMiddleware)
+
+
+@app.get("/api/products/{product_id}/insights")
+def insights(product_id: int, force_refresh: bool = False):
+    calls["count"] += 1
+    return {"product_id": product_id, "call": calls["count"]}
+
+
+client = TestClient(app)
+
+
+def setup_function():
+    calls["count"] = 0
+    invalidate_product_cache(1)
+
+
+def test_get_is_cached():
+    first = client.get("/api/products/1/insights")
+    second = client.get("/api/products/1/insights")
+    assert first.json() == second.json() == {"product_id": 1, "call": 1}
+    assert first.headers["etag"] == second.headers["etag"]
+
+
+def test_force_refresh_1_bypasses_and_evicts():
+    client.get("/api/products/1/insights")
+    forced = client.get("/api/products/1/insights?force_refresh=1")
+    assert forced.json()["call"] == 2
+    # The un-forced entry was evicted too
+    assert client.get("/api/products/1/insights").json()["call"] == 3
+
+
+def test_force_refresh_spellings():
+    client.get("/api/products/1/insights")
+    for value in ("true", "True", "yes", "on"):
+        before = calls["count"]
+        client.get(f"/api/products/1/insights?force_refresh={value}")
+        assert calls["count"] == before + 1
+    
+    # A false force_refresh is an ordinary, cacheable GET
+    before = calls["count"]
+    client.get("/api/products/1/insights?force_refresh=false")
+    client.get("/api/products/1/insights?force_refresh=false")
+    assert calls["count"] == before + 1